@@ -2,12 +2,14 @@
 Digital Human SDK - 实时数字人合成SDK
 """
 from .core import DigitalHumanEngine
-from .models import Task, TaskStatus, FrameData, TaskResult
+from .models import Task, TaskStatus, FrameData, FramePatch, TaskResult, OfflineRenderResult
 from .callbacks import DigitalHumanCallback
 from .config import DigitalHumanConfig, Config
 from .llm import LLMChatClient
 from .tts import CosyVoiceClient
 from .threads import DigitalHumanSynthesisThread, AudioPlayerThread
+from .video.compositor import FrameCompositor
+from .offline import OfflineRenderer
 
 __version__ = "1.0.0"
 __author__ = "Digital Human Team"
@@ -16,9 +18,12 @@ __description__ = "实时数字人合成SDK - 支持语音合成、唇形同步
 __all__ = [
     # 核心组件
     "DigitalHumanEngine",
+    "OfflineRenderer",
     
     # 数据模型和配置 - 统一使用DigitalHumanConfig
-    "Task", "TaskStatus", "DigitalHumanConfig", "FrameData", "TaskResult",
+    "Task", "TaskStatus", "DigitalHumanConfig", "FrameData", "FramePatch", "TaskResult",
+    "OfflineRenderResult",
+    "FrameCompositor",
     
     # 向后兼容
     "Config",  # Config现在是DigitalHumanConfig的别名
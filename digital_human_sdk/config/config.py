@@ -3,7 +3,7 @@ Digital Human SDK - Unified Configuration
 """
 from pathlib import Path
 from dataclasses import dataclass
-from typing import Optional
+from typing import Dict, Optional, Tuple, Union
 
 
 @dataclass
@@ -12,6 +12,7 @@ class DigitalHumanConfig:
     # 模型路径配置
     checkpoint_path: str = "./digital_human_sdk/assets/weight/trained.pth"
     dataset_path: str = "./digital_human_sdk/assets/data"
+    avatar_bundle_path: Optional[str] = None  # 单文件形象包(.dhav)，设置后优先于dataset_path
     
     # 音频配置
     asr_type: str = "hubert"  # hubert 或 wenet
@@ -27,10 +28,72 @@ class DigitalHumanConfig:
     tts_server_host: str = "localhost"
     tts_server_port: int = 8998
     tts_mode: str = "zero_shot"  # sft, zero_shot, cross_lingual, instruct
+    offline_tts_concurrency: int = 4  # 离线渲染时同时请求TTS的句数
     
     # 视频配置
     video_fps: int = 25
     idle_image_count: int = 10  # IDLE模式循环的图片数量
+    output_mode: str = "full"  # 帧输出模式: full (整帧图像), roi (仅人脸区域+底图索引)
+    output_size: Optional[Tuple[int, int]] = None  # 输出尺寸 (宽, 高)，为空时与底图一致，某一边为0时按宽高比推算
+    output_pixel_format: str = "bgr"  # 输出像素格式: bgr, rgb, rgba, i420, nv12
+    frame_pool_size: int = 0  # 整帧输出的预分配缓冲区数量（渲染领先播放的上限），0表示每帧新分配；启用后 FrameData.image 只在回调期间有效
+    offline_video_codec: str = "mp4v"  # 离线渲染 cv2.VideoWriter 的 FourCC 编码
+    offline_mux_audio: bool = True  # 离线渲染后用 ffmpeg（如可用）将音轨合入MP4
+    
+    # 帧缓存配置
+    frame_cache_max_bytes: int = 1024 * 1024 * 1024  # 解码帧缓存上限（字节）
+    frame_cache_preload: bool = True  # 数据集能放入缓存时，启动时并行预加载全部帧
+    frame_cache_preload_workers: int = 4  # 预加载线程数
+    frame_cache_prefetch: int = 8  # 数据集超出缓存上限时顺序预取的帧数
+    landmark_index_cache: bool = True  # 将关键点索引缓存为数据集目录下的 .npz 旁路文件
+    encoder_cache_max_bytes: int = 512 * 1024 * 1024  # UNet编码器特征缓存上限（字节，位于推理设备上）；每帧约6MB (base) / 3MB (slim)，容纳全部形象帧时顺序播放才能命中
+    encoder_cache_persist: bool = False  # 启动时计算全部形象帧的编码器特征并保存到形象旁（文件大小约为每帧特征×帧数），只预加载缓存放得下的帧
+    
+    # 多形象配置
+    avatars: Optional[Dict[str, Union[str, dict]]] = None  # 额外形象: 形象ID -> 数据目录/.dhav形象包，或覆盖配置项的字典
+    avatar_memory_budget_bytes: int = 4 * 1024 * 1024 * 1024  # 全部已加载形象的缓存合计上限（字节），超出时卸载最久未用的空闲形象
+    avatar_preload: bool = True  # 启动后在后台预加载额外形象
+    
+    # 推理配置
+    device: str = "auto"  # 推理设备: auto, cpu, cuda (或 cuda:N)
+    torch_num_threads: int = 0  # CPU推理的intra-op线程数，0表示使用torch默认值
+    render_workers: int = 1  # 并行渲染的工作线程数（共享权重），1表示在合成线程中串行渲染
+    render_threads_per_worker: int = 0  # 每个渲染工作线程的算子线程数（torch/OpenCV），0表示按CPU数平均分配
+    render_cpu_affinity: bool = False  # 将各渲染工作线程绑定到互不重叠的CPU上（仅Linux）
+    model_width: str = "auto"  # 网络宽度: auto (由权重推断), base, slim
+    fuse_bn: bool = True  # 加载后将BatchNorm折叠进卷积（附带与未折叠模型的一致性校验）
+    checkpoint_mmap: bool = True  # 以内存映射方式读取权重；配合 tools.convert_checkpoint 转换的文件，多进程共享同一份权重内存
+    inference_batch_size: int = 8  # 每次前向推理的帧数
+    inference_stride: int = 1  # 每隔几帧推理一次（2即12.5fps推理），中间帧插值生成；任务可单独指定
+    frame_interpolation: str = "blend"  # 中间帧插值方式: blend (线性混合), flow (光流变形后混合)
+    frame_deadline_scheduling: bool = False  # 以音频播放为时钟，跳过赶不上呈现时间的帧的推理，显示时丢弃过期帧
+    late_frame_policy: str = "hold"  # 赶不上时的处理: hold (重复上一帧), interpolate (先降为隔帧推理，仍赶不上再重复)
+    frame_deadline_slack_ms: int = 40  # 允许晚于呈现时间的容差（毫秒）
+    inference_backend: str = "torch"  # 推理后端: torch, onnx (ONNX Runtime CPU)
+    torch_compile: str = "none"  # torch后端的图编译方式: none, trace (TorchScript), compile (torch.compile)
+    inference_warmup: bool = True  # 引擎启动时预热推理后端
+    onnx_num_threads: int = 0  # ONNX Runtime的intra-op线程数，0表示使用默认值
+    opencv_num_threads: int = 0  # OpenCV（缩放、合成、插值）的线程数，0表示使用OpenCV默认值
+    model_cache_dir: str = "./digital_human_sdk/assets/cache"  # 导出模型等推理产物的缓存目录
+    precision: str = "fp32"  # 推理精度: fp32, bf16 (torch后端), int8-dynamic, int8-static (onnx后端)
+    calibration_audio_path: Optional[str] = None  # 录制会话的音频特征(.npy)，用于int8-static校准和精度漂移报告
+    calibration_frames: int = 256  # 校准/漂移报告使用的形象帧数
+    precision_report: bool = True  # 非fp32精度加载后报告相对fp32的PSNR/SSIM漂移
+    
+    # 自动调优配置
+    autotune: bool = False  # 启动时按本机实测选择推理后端、批大小和线程数（结果写入本机配置档案，之后直接复用）
+    autotune_budget_s: float = 60.0  # 调优的时间预算（秒，含加载形象）
+    autotune_backends: Tuple[str, ...] = ("torch", "torch-trace", "onnx")  # 候选后端: torch, torch-trace, torch-compile, onnx
+    autotune_precisions: Tuple[str, ...] = ("fp32",)  # 候选精度；加入 bf16 / int8-dynamic 等表示接受相应的画质漂移；int8-static 需要校准文件
+    autotune_profile_dir: Optional[str] = None  # 本机配置档案目录，为空时使用 model_cache_dir
+    
+    # 静音跳过配置
+    silence_skip: bool = False  # 按音频能量检测停顿，静音帧跳过口型推理，输出 silence_frame 画面
+    vad_threshold_db: float = -40.0  # 有声判定的块能量阈值（dBFS）
+    vad_hangover_frames: int = 5  # 能量回落后保持有声状态的帧数
+    vad_padding_frames: int = 3  # 有声区间向两侧扩展的帧数（口型过渡）
+    silence_frame: str = "closed"  # 静音帧画面: closed (缓存的闭口渲染), raw (原始底图)
+    silence_cache_max_bytes: int = 128 * 1024 * 1024  # 闭口渲染缓存上限（字节）
     
     # 兼容属性 - 为了向后兼容
     @property
@@ -71,7 +134,11 @@ class DigitalHumanConfig:
                 print(f"警告: 模型文件不存在: {self.checkpoint_path}")
                 return False
                 
-            if not Path(self.dataset_path).exists():
+            if self.avatar_bundle_path:
+                if not Path(self.avatar_bundle_path).exists():
+                    print(f"警告: 形象包不存在: {self.avatar_bundle_path}")
+                    return False
+            elif not Path(self.dataset_path).exists():
                 print(f"警告: 数据集路径不存在: {self.dataset_path}")
                 return False
             
@@ -83,6 +150,102 @@ class DigitalHumanConfig:
             if self.hubert_sampling_rate <= 0:
                 print(f"错误: 采样率无效: {self.hubert_sampling_rate}")
                 return False
+            
+            if self.device not in ("auto", "cpu") and not self.device.startswith("cuda"):
+                print(f"错误: 推理设备无效: {self.device}")
+                return False
+            
+            if self.inference_backend not in ("torch", "onnx"):
+                print(f"错误: 推理后端无效: {self.inference_backend}")
+                return False
+            
+            if self.torch_compile not in ("none", "trace", "compile"):
+                print(f"错误: torch编译方式无效: {self.torch_compile}")
+                return False
+            
+            if self.precision not in ("fp32", "bf16", "int8-dynamic", "int8-static"):
+                print(f"错误: 推理精度无效: {self.precision}")
+                return False
+            
+            if (self.precision.startswith("int8") and self.inference_backend != "onnx") or (
+                    self.precision == "bf16" and self.inference_backend != "torch"):
+                print(f"错误: 推理后端 {self.inference_backend} 不支持精度 {self.precision}"
+                      f"（int8 仅 onnx 后端，bf16 仅 torch 后端）")
+                return False
+            
+            if self.precision == "int8-static" and not (
+                    self.calibration_audio_path and Path(self.calibration_audio_path).exists()):
+                print(f"错误: int8-static 需要校准音频特征文件: {self.calibration_audio_path}")
+                return False
+            
+            if self.model_width not in ("auto", "base", "slim"):
+                print(f"错误: 网络宽度无效: {self.model_width}")
+                return False
+            
+            if self.output_mode not in ("full", "roi"):
+                print(f"错误: 帧输出模式无效: {self.output_mode}")
+                return False
+            
+            if self.output_pixel_format not in ("bgr", "rgb", "rgba", "i420", "nv12"):
+                print(f"错误: 输出像素格式无效: {self.output_pixel_format}")
+                return False
+            
+            if self.output_size is not None and (len(self.output_size) != 2 or min(self.output_size) < 0):
+                print(f"错误: 输出尺寸无效: {self.output_size}")
+                return False
+            
+            if self.silence_frame not in ("closed", "raw"):
+                print(f"错误: 静音帧画面无效: {self.silence_frame}")
+                return False
+            
+            if self.inference_stride < 1 or self.frame_interpolation not in ("blend", "flow"):
+                print(f"错误: 隔帧推理配置无效: {self.inference_stride}, {self.frame_interpolation}")
+                return False
+            
+            if self.late_frame_policy not in ("hold", "interpolate") or self.frame_deadline_slack_ms < 0:
+                print(f"错误: 帧调度配置无效: {self.late_frame_policy}, {self.frame_deadline_slack_ms}")
+                return False
+            
+            if self.render_workers < 1 or self.render_threads_per_worker < 0:
+                print(f"错误: 并行渲染配置无效: {self.render_workers}, {self.render_threads_per_worker}")
+                return False
+            
+            if self.autotune and (self.autotune_budget_s <= 0 or not self.autotune_backends or not set(
+                    self.autotune_backends) <= {"torch", "torch-trace", "torch-compile", "onnx"}):
+                print(f"错误: 自动调优配置无效: {self.autotune_budget_s}, {self.autotune_backends}")
+                return False
+            
+            if self.autotune and "int8-static" in self.autotune_precisions and not (
+                    self.calibration_audio_path and Path(self.calibration_audio_path).exists()):
+                print(f"错误: 自动调优候选 int8-static 需要校准音频特征文件: {self.calibration_audio_path}")
+                return False
+            
+            if self.offline_tts_concurrency < 1 or len(self.offline_video_codec) != 4:
+                print(f"错误: 离线渲染配置无效: {self.offline_tts_concurrency}, {self.offline_video_codec}")
+                return False
+            
+            if self.opencv_num_threads < 0:
+                print(f"错误: OpenCV线程数无效: {self.opencv_num_threads}")
+                return False
+            
+            if self.avatar_memory_budget_bytes < 0:
+                print(f"错误: 形象内存预算无效: {self.avatar_memory_budget_bytes}")
+                return False
+            
+            for avatar_id, avatar in (self.avatars or {}).items():
+                path = avatar.get("avatar_bundle_path") or avatar.get("dataset_path") if isinstance(avatar, dict) else avatar
+                if path and not Path(path).exists():
+                    print(f"警告: 形象 {avatar_id} 的路径不存在: {path}")
+                    return False
+            
+            if self.inference_batch_size <= 0:
+                print(f"错误: 推理批大小无效: {self.inference_batch_size}")
+                return False
+            
+            if self.frame_cache_max_bytes < 0 or self.frame_cache_prefetch < 0 or self.frame_pool_size < 0:
+                print(f"错误: 帧缓存配置无效: {self.frame_cache_max_bytes}, {self.frame_cache_prefetch}, "
+                      f"{self.frame_pool_size}")
+                return False
                 
             return True
             
@@ -1,6 +1,7 @@
 """
 Digital Human SDK - Core Engine
 """
+import queue
 import threading
 import time
 import os
@@ -9,14 +10,18 @@ import numpy as np
 from typing import Optional, List
 from PyQt5.QtCore import Qt, QTimer, QObject, pyqtSignal
 
-from .models import Task, TaskStatus, FrameData, TaskResult
+from .models import Task, TaskStatus, FrameData, FramePatch, TaskResult
 from .callbacks import DigitalHumanCallback
 
 # 导入SDK内部模块
 from .llm.llm_chat_client import LLMChatClient
 from .threads.digital_human_synthesis_thread import DigitalHumanSynthesisThread
 from .threads.audio_player_thread import AudioPlayerThread
+from .threads.frame_scheduler import PlaybackClock, ScheduledFrame
 from .video.video_model import VideoModel
+from .video.avatar_registry import AvatarRegistry, DEFAULT_AVATAR
+from .video.autotune import autotune
+from .video.frame_pool import PooledFrame
 from .config.config import Config
 
 
@@ -52,6 +57,16 @@ class DigitalHumanEngine(QObject):
         self.idle_timer: Optional[QTimer] = None
         self.queue_check_timer: Optional[QTimer] = None
         
+        # 音频播放时钟（按呈现截止时间调度帧）与显示时丢弃的过期帧数
+        self.playback_clock: Optional[PlaybackClock] = None
+        self._dropped_frames = 0
+        
+        # 当前任务使用的形象（非默认形象时在任务结束后释放引用）；形象在合成线程中获取
+        self.task_model: Optional[VideoModel] = None
+        self._task_avatar: Optional[str] = None
+        self._avatar_task: Optional[Task] = None
+        self._avatar_lock = threading.Lock()
+        
         # 连接信号
         self._connect_signals()
         
@@ -67,8 +82,22 @@ class DigitalHumanEngine(QObject):
                 n=self.config.llm_response_chunk_size
             )
             
-            # 初始化视频模型
-            self.video_model = VideoModel(config=self.config)
+            # 按本机调优结果选择推理后端、批大小和线程数（首次启动时测量并写入本机配置档案）
+            if self.config.autotune:
+                self.config = autotune(self.config)
+            
+            # 初始化形象注册表与默认形象的视频模型；权重相同的形象共用推理后端
+            self.avatars = AvatarRegistry(self.config, self.config.avatar_memory_budget_bytes)
+            self.avatars.register(DEFAULT_AVATAR)
+            for avatar_id, avatar in (self.config.avatars or {}).items():
+                if isinstance(avatar, dict):
+                    self.avatars.register(avatar_id, **avatar)
+                else:
+                    self.avatars.register(avatar_id, avatar)
+            self.video_model = self.avatars.acquire(DEFAULT_AVATAR)
+            self.compositor = self.video_model.compositor
+            if self.config.avatar_preload:
+                self.avatars.preload()
             
             print("数字人引擎初始化成功")
         except Exception as e:
@@ -82,11 +111,21 @@ class DigitalHumanEngine(QObject):
         self.idle_frame_ready.connect(self._on_idle_frame_ready)
         self.task_status_changed.connect(self._on_task_status_changed)
     
-    def submit_question(self, question: str) -> bool:
-        """提交问题给数字人处理"""
+    def submit_question(self, question: str, inference_stride: Optional[int] = None,
+                        avatar_id: Optional[str] = None) -> bool:
+        """提交问题给数字人处理
+
+        :param inference_stride: 本任务每隔几帧推理一次（中间帧插值），为空时使用配置；
+                                 低优先级或负载较高时可传2，推理量约减半，音频仍为全帧率
+        :param avatar_id: 本任务使用的形象（config.avatars 中的ID），为空时使用默认形象
+        """
         if not question.strip():
             return False
         
+        if avatar_id is not None and avatar_id not in self.avatars:
+            print(f"未登记的形象: {avatar_id}")
+            return False
+        
         # 防止快速点击：检查是否正在提交任务
         if self._submitting_task:
             print("正在提交任务中，请稍候...")
@@ -105,7 +144,7 @@ class DigitalHumanEngine(QObject):
         try:
             # 创建新任务
             self.task_counter += 1
-            task = Task(self.task_counter, question)
+            task = Task(self.task_counter, question, inference_stride=inference_stride, avatar_id=avatar_id)
             
             # 提交给LLM客户端
             if not self.llm_client.receive_task(task):
@@ -118,6 +157,7 @@ class DigitalHumanEngine(QObject):
             
             # 重置帧计数器（每个新任务重新开始计数）
             self._frame_counter = 0
+            self._dropped_frames = 0
             
             # 发出状态变更信号
             self.task_status_changed.emit(self.current_task, old_status, TaskStatus.RUNNING)
@@ -140,12 +180,20 @@ class DigitalHumanEngine(QObject):
     def _start_task_processing(self, task: Task):
         """启动任务处理"""
         try:
+            self.playback_clock = PlaybackClock() if self.config.frame_deadline_scheduling else None
+            
+            # 任务形象由合成线程获取：未驻留的形象在合成线程中加载，界面线程继续显示IDLE帧
+            self._release_task_avatar()
+            with self._avatar_lock:
+                self._avatar_task = task
+            
             # 启动数字人合成线程
-            self.digital_human_thread = DigitalHumanSynthesisThread(task, self.video_model)
+            self.digital_human_thread = DigitalHumanSynthesisThread(
+                task, lambda: self._acquire_task_avatar(task), clock=self.playback_clock)
             self.digital_human_thread.start()
             
             # 启动音频播放线程
-            self.audio_player_thread = AudioPlayerThread(task)
+            self.audio_player_thread = AudioPlayerThread(task, clock=self.playback_clock)
             self.audio_player_thread.start()
             
             # 启动帧处理定时器
@@ -161,6 +209,37 @@ class DigitalHumanEngine(QObject):
             print(error_msg)
             self.callback.on_error(task, error_msg)
     
+    def _acquire_task_avatar(self, task: Task) -> VideoModel:
+        """获取任务形象（在合成线程中调用，未驻留的形象在此加载）
+
+        默认形象常驻，其他形象在任务期间持有引用，避免被淘汰；
+        加载完成前任务已结束时立即归还引用。
+        """
+        avatar_id = task.avatar_id
+        if avatar_id is None or avatar_id == DEFAULT_AVATAR:
+            model, avatar_id = self.video_model, None
+        else:
+            model = self.avatars.acquire(avatar_id)
+        with self._avatar_lock:
+            if self._avatar_task is task:
+                self._task_avatar = avatar_id
+                self.task_model = model
+                self.compositor = model.compositor
+                return model
+        if avatar_id is not None:
+            self.avatars.release(avatar_id)
+        return model
+    
+    def _release_task_avatar(self):
+        """释放任务形象的引用，恢复默认形象的合成器"""
+        with self._avatar_lock:
+            if self._task_avatar is not None:
+                self.avatars.release(self._task_avatar)
+                self._task_avatar = None
+            self._avatar_task = None
+            self.task_model = None
+            self.compositor = self.video_model.compositor
+    
     def _start_frame_timer(self, task: Task):
         """启动帧处理定时器 - 使用高精度定时器确保音视频同步"""
         self.frame_timer = QTimer()
@@ -176,20 +255,39 @@ class DigitalHumanEngine(QObject):
         try:
             # 尝试从队列获取图像
             img = task.llm_virtual_image_queue.get(timeout=0.01)
+            img = self._skip_late_frames(task, img)
             if img is not None:
                 # 如果这是第一帧，停止IDLE模式
                 if self.is_idle:
                     self.stop_idle_mode()
                 
-                # 创建帧数据
-                frame_data = FrameData(
-                    image=img,
-                    frame_index=getattr(self, '_frame_counter', 0),
-                    is_idle=False
-                )
+                # 创建帧数据：ROI模式下只携带人脸区域
+                frame_index = getattr(self, '_frame_counter', 0)
+                if isinstance(img, FramePatch):
+                    frame_data = FrameData(
+                        frame_index=frame_index,
+                        is_idle=False,
+                        base_index=img.base_index,
+                        rect=img.rect,
+                        patch=img.patch
+                    )
+                elif isinstance(img, PooledFrame):
+                    frame_data = FrameData(
+                        image=img.array,
+                        frame_index=frame_index,
+                        is_idle=False,
+                        buffer=img
+                    )
+                else:
+                    frame_data = FrameData(
+                        image=img,
+                        frame_index=frame_index,
+                        is_idle=False
+                    )
                 
-                # 发出帧就绪信号
+                # 发出帧就绪信号；回调返回后归还引擎持有的缓冲区引用
                 self.frame_ready.emit(task, frame_data)
+                frame_data.release()
                 
                 # 更新帧计数器
                 self._frame_counter = getattr(self, '_frame_counter', 0) + 1
@@ -198,6 +296,28 @@ class DigitalHumanEngine(QObject):
             # 队列为空或其他异常，继续等待
             pass
     
+    def _skip_late_frames(self, task: Task, img):
+        """解包 ScheduledFrame；已错过呈现时间且队列中还有后续帧时丢弃，使视频追上音频"""
+        slack = self.config.frame_deadline_slack_ms / 1000.0
+        while isinstance(img, ScheduledFrame):
+            deadline = self.playback_clock.deadline(img.sample) if self.playback_clock else None
+            if deadline is None or time.monotonic() <= deadline + slack:
+                return img.frame
+            try:
+                next_img = task.llm_virtual_image_queue.get_nowait()
+            except queue.Empty:
+                return img.frame
+            img.release()
+            self._dropped_frames += 1
+            img = next_img
+        return img
+    
+    def compose_frame(self, frame_data: FrameData):
+        """获取帧数据对应的完整图像（ROI帧贴回底图，其余直接返回image）"""
+        if frame_data.is_roi:
+            return self.compositor.compose_frame(frame_data)
+        return frame_data.image
+    
     def start_idle_mode(self):
         """启动IDLE模式"""
         if self.idle_timer and self.idle_timer.isActive():
@@ -226,21 +346,25 @@ class DigitalHumanEngine(QObject):
     def _process_idle_frame(self):
         """处理IDLE帧"""
         try:
-            # 构建图片路径
-            img_dir = os.path.join(self.config.dataset_path, "full_body_img")
-            image_path = os.path.join(img_dir, f"{self.idle_frame_index}.jpg")
-            
-            if os.path.exists(image_path):
-                idle_image = cv2.imread(image_path)
-                if idle_image is not None:
-                    frame_data = FrameData(
-                        image=idle_image,
-                        frame_index=self.idle_frame_index,
-                        is_idle=True
-                    )
-                    
-                    # 发出IDLE帧就绪信号
-                    self.idle_frame_ready.emit(frame_data)
+            # 优先使用视频模型的解码帧缓存
+            idle_image = None
+            if hasattr(self, 'video_model'):
+                idle_image = self.video_model.get_output_frame(self.idle_frame_index)
+            else:
+                img_dir = os.path.join(self.config.dataset_path, "full_body_img")
+                image_path = os.path.join(img_dir, f"{self.idle_frame_index}.jpg")
+                if os.path.exists(image_path):
+                    idle_image = cv2.imread(image_path)
+
+            if idle_image is not None:
+                frame_data = FrameData(
+                    image=idle_image,
+                    frame_index=self.idle_frame_index,
+                    is_idle=True
+                )
+                
+                # 发出IDLE帧就绪信号
+                self.idle_frame_ready.emit(frame_data)
             
             # 循环索引
             self.idle_frame_index = (self.idle_frame_index + 1) % self.config.idle_image_count
@@ -269,6 +393,18 @@ class DigitalHumanEngine(QObject):
             # 这1秒足够让剩余的帧播放完成
             QTimer.singleShot(1000, self._complete_current_task)
     
+    def _release_pending_frames(self, task: Optional[Task]):
+        """归还队列中未播放帧的缓冲区"""
+        if task is None:
+            return
+        while True:
+            try:
+                img = task.llm_virtual_image_queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(img, (PooledFrame, ScheduledFrame)):
+                img.release()
+    
     def _cleanup_failed_task(self):
         """清理失败的任务状态"""
         # 停止可能已启动的定时器
@@ -282,6 +418,8 @@ class DigitalHumanEngine(QObject):
             self.digital_human_thread.stop()
         if self.audio_player_thread and self.audio_player_thread.is_alive():
             self.audio_player_thread.stop()
+        self._release_pending_frames(self.current_task)
+        self._release_task_avatar()
         
         # 重置状态
         self._frame_counter = 0
@@ -300,16 +438,21 @@ class DigitalHumanEngine(QObject):
             self.frame_timer.stop()
         if self.queue_check_timer:
             self.queue_check_timer.stop()
+        self._release_pending_frames(self.current_task)
         
         # 更新任务状态
         old_status = self.current_task.status
         self.current_task.end_task(success=True)
         
         # 创建任务结果
+        render_stats = self.digital_human_thread.render_stats if self.digital_human_thread else None
+        if render_stats is not None:
+            render_stats.dropped_frames = self._dropped_frames
         result = TaskResult(
             task_id=self.current_task.task_id,
             success=True,
-            total_frames=self._frame_counter  # 直接使用，因为已经在submit_question中初始化
+            total_frames=self._frame_counter,  # 直接使用，因为已经在submit_question中初始化
+            render_stats=render_stats
         )
         
         # 发出完成信号
@@ -318,7 +461,8 @@ class DigitalHumanEngine(QObject):
         # 发出状态变更信号
         self.task_status_changed.emit(self.current_task, old_status, TaskStatus.FINISHED)
         
-        # 重新进入IDLE模式
+        # 释放任务形象并重新进入IDLE模式
+        self._release_task_avatar()
         self.current_task.set_idle()
         self.start_idle_mode()
         
@@ -352,4 +496,10 @@ class DigitalHumanEngine(QObject):
         if self.audio_player_thread and self.audio_player_thread.is_alive():
             self.audio_player_thread.stop()
         
+        # 卸载全部形象：释放各级缓存、渲染工作线程与推理后端
+        if hasattr(self, 'video_model'):
+            self._release_task_avatar()
+        if hasattr(self, 'avatars'):
+            self.avatars.close()
+        
         print("数字人引擎已关闭")
\ No newline at end of file
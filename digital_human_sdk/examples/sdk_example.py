@@ -45,7 +45,8 @@ class SDKDigitalHumanCallback(DigitalHumanCallback):
     
     def on_frame_ready(self, task: Task, frame_data: FrameData):
         """新帧准备就绪"""
-        self.ui_app.display_frame(frame_data.image)
+        # ROI输出模式下需要把人脸区域贴回底图
+        self.ui_app.display_frame(self.ui_app.engine.compose_frame(frame_data))
     
     def on_idle_frame_ready(self, frame_data: FrameData):
         """IDLE帧准备就绪"""
@@ -90,6 +91,9 @@ class SDKDigitalHumanApp(QMainWindow):
             # 视频配置
             video_fps=25,
             idle_image_count=10,
+            # 引擎直接输出显示用的RGB帧，界面线程无需逐帧缩放和转换颜色
+            output_size=(0, 600),
+            output_pixel_format="rgb",
             
             # 音频配置
             asr_type="hubert",
@@ -178,22 +182,13 @@ class SDKDigitalHumanApp(QMainWindow):
             return
         
         try:
-            # 转换OpenCV图像为Qt格式
+            # 引擎输出已是目标尺寸的RGB帧，直接包装为Qt图像
             height, width, channel = image.shape
             bytes_per_line = 3 * width
-            q_image = QImage(image.data, width, height, bytes_per_line, QImage.Format_RGB888).rgbSwapped()
-            
-            # 创建QPixmap并缩放
-            pixmap = QPixmap.fromImage(q_image)
-            scaled_pixmap = pixmap.scaled(
-                self.video_label.width(),
-                self.video_label.height(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            )
+            q_image = QImage(image.data, width, height, bytes_per_line, QImage.Format_RGB888)
             
-            # 显示图像
-            self.video_label.setPixmap(scaled_pixmap)
+            # 显示图像（QPixmap会复制像素，之后缓冲区可以归还）
+            self.video_label.setPixmap(QPixmap.fromImage(q_image))
             
         except Exception as e:
             print(f"显示图像时出错: {e}")
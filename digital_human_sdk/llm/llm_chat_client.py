@@ -8,6 +8,11 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from ..models import Task, TaskStatus
 
+# 分句标点：文本累积超过最小长度后在这些标点处切分，逐句送入TTS
+PUNCTUATION = {
+    '，', '。', '！', '？', '；', ',', '.', '!', '?', ';', ':', '：', '”', '’', '"', "'"
+}
+
 
 class LLMChatClient:
     """LLM聊天客户端"""
@@ -18,9 +23,7 @@ class LLMChatClient:
         self.timeout = timeout
         self.n = n
         self.current_task = None
-        self.punctuation_set = {
-            '，', '。', '！', '？', '；', ',', '.', '!', '?', ';', ':', '：', '”', '’', '"', "'"
-        }
+        self.punctuation_set = PUNCTUATION
 
         self.session = requests.Session()
         retry_strategy = Retry(
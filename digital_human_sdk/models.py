@@ -4,7 +4,7 @@ Digital Human SDK - Data Models
 import queue
 from enum import Enum
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Tuple
 
 
 class TaskStatus(Enum):
@@ -19,9 +19,12 @@ class TaskStatus(Enum):
 
 class Task:
     """任务类"""
-    def __init__(self, task_id: int, question: str):
+    def __init__(self, task_id: int, question: str, inference_stride: Optional[int] = None,
+                 avatar_id: Optional[str] = None):
         self.task_id = task_id
         self.question = question
+        self.inference_stride = inference_stride  # 为空时使用配置中的 inference_stride
+        self.avatar_id = avatar_id  # 为空时使用默认形象
         self.llm_response_queue = queue.Queue()
         self.llm_virtual_image_queue = queue.Queue()
         self.llm_response_audio_chunk_queue = queue.Queue()
@@ -45,12 +48,93 @@ class Task:
 
 
 @dataclass
+class FramePatch:
+    """ROI输出：重新合成的人脸区域及其在底图中的位置"""
+    base_index: int  # 底图（形象帧）索引
+    rect: Tuple[int, int, int, int]  # (xmin, ymin, xmax, ymax)
+    patch: object  # numpy array，形状为 (ymax-ymin, xmax-xmin, 3)
+
+
+@dataclass(slots=True)
 class FrameData:
-    """帧数据"""
+    """帧数据
+
+    完整输出模式下 image 为整帧图像；ROI输出模式下 image 为 None，
+    由 base_index/rect/patch 描述，需要整帧时使用 FrameCompositor 合成。
+
+    image 可能来自帧缓冲池（buffer 不为空），此时只在 on_frame_ready 回调期间有效；
+    需要在回调之后继续使用时调用 retain()，用完后 release()（或使用 with 语句）。
+    """
     image: Optional[object] = None  # numpy array
     audio_chunk: Optional[object] = None  # numpy array
     frame_index: int = 0
     is_idle: bool = False
+    base_index: Optional[int] = None  # ROI模式：底图索引
+    rect: Optional[Tuple[int, int, int, int]] = None  # ROI模式：人脸区域 (xmin, ymin, xmax, ymax)
+    patch: Optional[object] = None  # ROI模式：人脸区域图像
+    buffer: Optional[object] = None  # 帧缓冲池句柄（PooledFrame）
+
+    @property
+    def is_roi(self) -> bool:
+        return self.patch is not None
+
+    def retain(self) -> "FrameData":
+        """在回调之外继续持有池化的图像缓冲区"""
+        if self.buffer is not None:
+            self.buffer.retain()
+        return self
+
+    def release(self):
+        """归还一次持有的缓冲区引用；非池化帧为空操作"""
+        if self.buffer is not None:
+            self.buffer.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+@dataclass
+class RenderStats:
+    """渲染统计
+
+    inferred/interpolated/skipped/held 为合成线程对每帧的处理方式（实际推理、隔帧插值、
+    静音跳过、赶不上截止时间而重复上一帧）；dropped 为显示时已过期而被丢弃的帧。
+    """
+    inferred_frames: int = 0
+    skipped_frames: int = 0
+    interpolated_frames: int = 0
+    held_frames: int = 0
+    dropped_frames: int = 0
+
+    @property
+    def total_frames(self) -> int:
+        return self.inferred_frames + self.skipped_frames + self.interpolated_frames + self.held_frames
+
+    @property
+    def skip_ratio(self) -> float:
+        """静音跳过推理的帧占比"""
+        return self.skipped_frames / self.total_frames if self.total_frames else 0.0
+
+
+@dataclass
+class OfflineRenderResult:
+    """离线渲染结果"""
+    video_path: str
+    audio_path: str
+    muxed: bool  # video_path 是否已合入音轨
+    frames: int
+    duration: float  # 音频时长（秒）
+    tts_wait: float = 0.0  # 渲染等待TTS结果的总用时（秒）
+    elapsed: float = 0.0  # 端到端用时（秒）
+    render_stats: Optional[RenderStats] = None
+
+    @property
+    def rtf(self) -> float:
+        """实时率：用时 / 音频时长，小于1即快于实时"""
+        return self.elapsed / self.duration if self.duration else 0.0
 
 
 @dataclass
@@ -60,4 +144,5 @@ class TaskResult:
     success: bool
     error_message: Optional[str] = None
     total_frames: int = 0
-    duration: float = 0.0
\ No newline at end of file
+    duration: float = 0.0
+    render_stats: Optional[RenderStats] = None
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""
+Digital Human SDK - Offline Rendering
+
+实时引擎按帧率（QTimer）播放，生成一段回答视频至少需要与其时长相同的时间。
+离线渲染不经过播放：按句并发请求TTS，每句使用独立的渲染上下文整句批量推理
+（配置 render_workers 时由工作线程并行渲染），视频编码在单独的线程中与推理重叠，
+输出 MP4（cv2.VideoWriter）与 WAV，ffmpeg 可用时把音轨合入MP4，并报告实时率。
+"""
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .config.config import Config
+from .exceptions import ConfigurationError, TaskSubmissionError
+from .llm.llm_chat_client import PUNCTUATION
+from .models import OfflineRenderResult, RenderStats
+from .threads.digital_human_synthesis_thread import synthesize_speech
+from .tts.cosyvoice_client import CosyVoiceClient
+from .utils.vad import VoiceActivityDetector
+from .video.video_model import VideoModel
+
+SAMPLE_RATE = 16000
+# 每个视频帧对应的音频采样点数（与实时合成线程一致，即25fps）
+CHUNK_SAMPLES = 640
+VIDEO_FPS = SAMPLE_RATE / CHUNK_SAMPLES
+
+
+def split_sentences(text: str, min_chars: int = 15) -> List[str]:
+    """按标点分句，与LLM流式输出的分句方式一致：累积超过 min_chars 个字符后在标点处切分"""
+    sentences, buffer = [], ""
+    for char in text:
+        buffer += char
+        if char in PUNCTUATION and len(buffer.strip()) > min_chars:
+            sentences.append(buffer.strip())
+            buffer = ""
+    if buffer.strip():
+        sentences.append(buffer.strip())
+    return sentences
+
+
+def read_wav(path: str) -> np.ndarray:
+    """读取16kHz单声道16位PCM WAV为float32音频"""
+    with wave.open(path, "rb") as f:
+        if (f.getframerate(), f.getnchannels(), f.getsampwidth()) != (SAMPLE_RATE, 1, 2):
+            raise ConfigurationError(f"音频需为 {SAMPLE_RATE}Hz 单声道16位PCM: {path}")
+        pcm = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2")
+    return pcm.astype(np.float32) / 32768.0
+
+
+def write_wav(path: str, audio: np.ndarray):
+    """float32音频写入16kHz单声道16位PCM WAV"""
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(pcm.tobytes())
+
+
+def mux_audio(video_path: str, audio_path: str, output_path: str) -> bool:
+    """用 ffmpeg 把WAV音轨合入MP4（视频流直接复制），成功返回 True"""
+    command = ["ffmpeg", "-y", "-loglevel", "error", "-i", video_path, "-i", audio_path,
+               "-c:v", "copy", "-c:a", "aac", "-shortest", output_path]
+    try:
+        subprocess.run(command, check=True, capture_output=True)
+        return True
+    except (OSError, subprocess.CalledProcessError) as e:
+        stderr = getattr(e, "stderr", b"") or b""
+        print(f"ffmpeg 合并音轨失败: {stderr.decode('utf-8', 'ignore').strip() or e}")
+        return False
+
+
+class OfflineRenderer:
+    """离线渲染器：文本（或已合成的语音与特征）-> MP4 + WAV
+
+    形象与权重只加载一次，同一个渲染器可连续渲染多段内容（非线程安全）。
+    """
+
+    def __init__(self, config: Config, model: Optional[VideoModel] = None):
+        """
+        :param model: 已加载的视频模型（须输出BGR整帧）；为空时按配置加载
+        """
+        self.config = config
+        self._owns_model = model is None
+        if model is None:
+            model = VideoModel(replace(config, output_mode="full", output_pixel_format="bgr", frame_pool_size=0))
+            if config.inference_warmup:
+                model.warmup()
+        elif model.compositor.pixel_format != "bgr":
+            raise ConfigurationError(f"离线渲染需要BGR输出，当前为 {model.compositor.pixel_format}")
+        self.model = model
+        self.vad = None
+        if config.silence_skip:
+            self.vad = VoiceActivityDetector(threshold_db=config.vad_threshold_db,
+                                             hangover=config.vad_hangover_frames,
+                                             padding=config.vad_padding_frames)
+        self._tts_client = None
+
+    @property
+    def tts_client(self) -> CosyVoiceClient:
+        """TTS客户端，首次使用时连接（gRPC通道可被多个线程并发使用）"""
+        if self._tts_client is None:
+            self._tts_client = CosyVoiceClient(host=self.config.tts_server_host, port=self.config.tts_server_port,
+                                               mode=self.config.tts_mode)
+        return self._tts_client
+
+    def render_text(self, text: str, output_path: str) -> OfflineRenderResult:
+        """文本 -> 视频：按句并发TTS，按句序渲染；先完成的句子不必等待后面句子的TTS"""
+        sentences = split_sentences(text, self.config.llm_response_chunk_size)
+        if not sentences:
+            raise TaskSubmissionError("没有可渲染的文本")
+        started = time.time()
+        print(f"离线渲染 {len(sentences)} 句，TTS并发 {self.config.offline_tts_concurrency}")
+        client = self.tts_client
+        with ThreadPoolExecutor(max_workers=self.config.offline_tts_concurrency,
+                                thread_name_prefix="offline-tts") as executor:
+            futures = [executor.submit(synthesize_speech, client, sentence, self.config.speaker_id)
+                       for sentence in sentences]
+            try:
+                return self.render_segments((future.result() for future in futures), output_path, started)
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def render_segments(self, segments: Iterable[Tuple[np.ndarray, np.ndarray]], output_path: str,
+                        started: Optional[float] = None) -> OfflineRenderResult:
+        """已合成的语音 -> 视频
+
+        :param segments: 按句序的 (16kHz float32音频, 音频特征) ，可以是惰性产生的迭代器
+        :param output_path: 输出MP4路径；音频写入同名 .wav
+        """
+        started = started or time.time()
+        base = os.path.splitext(output_path)[0]
+        audio_path = base + ".wav"
+        mux = self.config.offline_mux_audio and shutil.which("ffmpeg") is not None
+        video_path = base + ".video.mp4" if mux else output_path
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+        compositor = self.model.compositor
+        writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*self.config.offline_video_codec),
+                                 VIDEO_FPS, (compositor.width, compositor.height))
+        if not writer.isOpened():
+            raise ConfigurationError(f"无法创建视频文件: {video_path}（编码 {self.config.offline_video_codec}）")
+        # 编码线程与推理重叠；队列限制渲染领先编码的帧数
+        frames = queue.Queue(maxsize=4 * self.config.inference_batch_size)
+        errors = []
+
+        def encode():
+            while True:
+                frame = frames.get()
+                if frame is None:
+                    break
+                if not errors:
+                    try:
+                        writer.write(frame)
+                    except cv2.error as e:
+                        errors.append(e)
+
+        encoder = threading.Thread(target=encode, name="offline-encoder", daemon=True)
+        encoder.start()
+        stats = RenderStats()
+        audio_parts = []
+        frame_count = 0
+        tts_wait = 0.0
+        try:
+            segments = iter(segments)
+            while True:
+                wait_started = time.time()
+                segment = next(segments, None)
+                tts_wait += time.time() - wait_started
+                if segment is None:
+                    break
+                audio, features = segment
+                # 音频补齐到整帧，视频帧数与音频时长严格对应，多句拼接时不累积偏移
+                audio = np.pad(np.asarray(audio, dtype=np.float32), (0, -len(audio) % CHUNK_SAMPLES))
+                audio_parts.append(audio)
+                for frame in self._render_segment(audio, features, frame_count, stats):
+                    frames.put(frame)
+                frame_count += len(audio) // CHUNK_SAMPLES
+        finally:
+            frames.put(None)
+            encoder.join()
+            writer.release()
+        if errors:
+            raise errors[0]
+
+        audio = np.concatenate(audio_parts) if audio_parts else np.zeros(0, dtype=np.float32)
+        write_wav(audio_path, audio)
+        muxed = False
+        if mux:
+            muxed = mux_audio(video_path, audio_path, output_path)
+            if muxed:
+                os.remove(video_path)
+            else:
+                os.replace(video_path, output_path)
+        elif self.config.offline_mux_audio:
+            print("未找到 ffmpeg，视频与音频分别输出")
+
+        result = OfflineRenderResult(video_path=output_path, audio_path=audio_path, muxed=muxed,
+                                     frames=frame_count, duration=len(audio) / SAMPLE_RATE,
+                                     tts_wait=tts_wait, elapsed=time.time() - started, render_stats=stats)
+        print(f"离线渲染完成: {output_path}{'（含音轨）' if muxed else ''} + {audio_path}, {frame_count} 帧, "
+              f"时长 {result.duration:.1f}s, 用时 {result.elapsed:.1f}s（等待TTS {tts_wait:.1f}s）, "
+              f"RTF {result.rtf:.2f}（{1 / result.rtf if result.rtf else 0:.1f}x 实时）")
+        return result
+
+    def close(self):
+        """释放渲染器自己加载的视频模型"""
+        if self._owns_model:
+            self.model.close()
+
+    def _render_segment(self, audio: np.ndarray, features: np.ndarray, frame_offset: int, stats: RenderStats):
+        """渲染一句的全部帧（BGR整帧），形象帧索引接续前面的句子"""
+        num_frames = len(audio) // CHUNK_SAMPLES
+        context = self.model.create_context(features)
+        indices = [(frame_offset + i) % self.model.len_img for i in range(num_frames)]
+        active = self.vad.speech_mask(audio, CHUNK_SAMPLES) if self.vad is not None else None
+        stride = self.config.inference_stride
+        voiced = [i for i in range(num_frames) if active is None or active[i]]
+        interpolated = sum(1 for i in voiced if i % stride)
+        stats.inferred_frames += len(voiced) - interpolated
+        stats.interpolated_frames += interpolated
+        stats.skipped_frames += num_frames - len(voiced)
+        # 并行渲染时整句交给工作线程池，按批并发、按序产出
+        render = self.model.process_frames if self.model.render_pool is None else self.model.render_pool.render
+        return render(indices, range(num_frames), self.config.inference_batch_size, active=active,
+                      stride=stride, pooled=False, roi=False, context=context)
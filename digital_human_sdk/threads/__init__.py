@@ -1,7 +1,8 @@
 """
 Digital Human SDK - Threads Module
 """
-from .digital_human_synthesis_thread import DigitalHumanSynthesisThread
+from .digital_human_synthesis_thread import DigitalHumanSynthesisThread, synthesize_speech
 from .audio_player_thread import AudioPlayerThread
+from .frame_scheduler import PlaybackClock, FrameScheduler, ScheduledFrame
 
-__all__ = ["DigitalHumanSynthesisThread", "AudioPlayerThread"]
\ No newline at end of file
+__all__ = ["DigitalHumanSynthesisThread", "synthesize_speech", "AudioPlayerThread", "PlaybackClock", "FrameScheduler", "ScheduledFrame"]
\ No newline at end of file
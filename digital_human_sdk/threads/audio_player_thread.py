@@ -8,10 +8,14 @@ import pyaudio
 class AudioPlayerThread(threading.Thread):
     """音频播放线程"""
     
-    def __init__(self, task, sampling_rate=16000):
+    def __init__(self, task, sampling_rate=16000, clock=None):
+        """
+        :param clock: 音频播放时钟（PlaybackClock），每次写入前更新播放位置
+        """
         super().__init__()
         self.task = task
         self.sampling_rate = sampling_rate
+        self.clock = clock
         self.stop_event = threading.Event()
         self.p = pyaudio.PyAudio()
         self.stream = self.p.open(
@@ -30,6 +34,8 @@ class AudioPlayerThread(threading.Thread):
                 chunk = self.task.llm_response_audio_chunk_queue.get()
                 if chunk is None:
                     break
+                if self.clock is not None:
+                    self.clock.on_write(len(chunk))
                 self.stream.write(chunk.tobytes())
         except Exception as e:
             print(f"音频播放异常: {e}")
@@ -2,18 +2,67 @@
 Digital Human SDK - Digital Human Synthesis Thread
 """
 import threading
+import time
 import numpy as np
 from ..tts.cosyvoice_client import CosyVoiceClient
+from ..models import RenderStats
+from ..utils.vad import VoiceActivityDetector
+from .frame_scheduler import FrameScheduler, ScheduledFrame
+
+
+def synthesize_speech(client, text, speaker_id="100", max_retries=3):
+    """调用TTS合成一句话，返回 (float32音频, 音频特征 [T, 2, 1024])，带重试机制"""
+    for attempt in range(max_retries):
+        try:
+            print(f"TTS合成尝试 {attempt + 1}/{max_retries}: {text[:50]}...")
+            
+            audio_data, raw_features = client.inference(speaker_id, tts_text=text)
+            
+            if not audio_data or not raw_features:
+                raise Exception("TTS返回空数据")
+            
+            audio_array = np.frombuffer(audio_data, dtype=np.float32)
+            features = np.frombuffer(raw_features, dtype=np.float32).reshape(-1, 2, 1024)
+            
+            print(f"TTS合成成功: 音频长度={len(audio_array)}, 特征形状={features.shape}")
+            return audio_array, features
+            
+        except Exception as e:
+            print(f"TTS合成失败 (尝试 {attempt + 1}/{max_retries}): {e}")
+            
+            if attempt == max_retries - 1:
+                # 最后一次尝试失败，抛出异常
+                raise Exception(f"TTS合成失败，已重试{max_retries}次: {str(e)}")
+            
+            # 等待一段时间后重试
+            time.sleep(1.0 * (attempt + 1))  # 递增等待时间
+            
+    return None, None
 
 
 class DigitalHumanSynthesisThread(threading.Thread):
     """数字人合成线程"""
     
-    def __init__(self, task, model, tts_config=None):
+    def __init__(self, task, model, tts_config=None, clock=None):
+        """
+        :param model: 视频模型，或返回视频模型的加载函数（形象未驻留时在本线程中加载，不阻塞调用线程）
+        :param clock: 音频播放时钟（PlaybackClock）；提供时按呈现截止时间调度推理，
+                      放入视频队列的帧包装为 ScheduledFrame
+        """
         super().__init__()
         self.task = task
-        self.model = model
+        self.model = None
+        self._model_loader = model if callable(model) else None
         self.stop_event = threading.Event()
+        self.render_stats = RenderStats()
+        # 已送入音频队列的采样点数（跨句累计），即下一句首帧的音频位置
+        self._sample_base = 0
+        
+        self.clock = clock
+        self.vad = None
+        self.scheduler = None
+        if self._model_loader is None:
+            self._bind_model(model)
         
         # 初始化TTS客户端 - 使用工作的默认配置
         if tts_config:
@@ -26,9 +75,25 @@ class DigitalHumanSynthesisThread(threading.Thread):
             # 使用原来工作的默认配置
             self.cosyvoice_grpc_client = CosyVoiceClient()
 
+    def _bind_model(self, model):
+        """设置视频模型，并按其配置创建静音检测与帧调度"""
+        self.model = model
+        config = model.config
+        # 静音检测：停顿处的帧跳过口型推理
+        if config.silence_skip:
+            self.vad = VoiceActivityDetector(threshold_db=config.vad_threshold_db,
+                                             hangover=config.vad_hangover_frames,
+                                             padding=config.vad_padding_frames)
+        if self.clock is not None:
+            self.scheduler = FrameScheduler(self.clock, policy=config.late_frame_policy,
+                                            slack=config.frame_deadline_slack_ms / 1000.0)
+
     def run(self):
         """运行数字人合成"""
         try:
+            if self._model_loader is not None:
+                self._bind_model(self._model_loader())
+            
             while True:
                 if self.stop_event.is_set():
                     break
@@ -42,31 +107,15 @@ class DigitalHumanSynthesisThread(threading.Thread):
                     continue
 
                 audio, features = self.do_tts(data)
-                self.model.set_audio_features(features)
-
-                total_frames = len(audio)
-                num_chunks = total_frames // 640
-
-                for i in range(num_chunks):
-                    if self.stop_event.is_set():
-                        break
+                self._process_audio_and_generate_frames(audio, self.model.create_context(features))
 
-                    start = i * 640
-                    end = start + 640
-                    chunk = audio[start:end]
-                    self.task.llm_response_audio_chunk_queue.put(chunk)
-
-                    try:
-                        img = self.model.process_frame(i % self.model.len_img, i)
-                        if img is not None:
-                            self.task.llm_virtual_image_queue.put(img)
-                    except Exception as e:
-                        print("模型异常:", e)
-
-                if total_frames % 640 > 0:
-                    chunk = audio[num_chunks * 640:]
-                    if chunk.size > 0:
-                        self.task.llm_response_audio_chunk_queue.put(chunk)
+            stats = self.render_stats
+            if stats.skipped_frames:
+                print(f"静音跳过 {stats.skipped_frames}/{stats.total_frames} 帧 ({stats.skip_ratio:.1%})")
+            if stats.interpolated_frames:
+                print(f"隔帧推理插值 {stats.interpolated_frames}/{stats.total_frames} 帧")
+            if stats.held_frames:
+                print(f"赶不上截止时间重复上一帧 {stats.held_frames}/{stats.total_frames} 帧")
 
             # 合成完成后，向队列添加结束标记
             self.task.llm_response_audio_chunk_queue.put(None)
@@ -78,35 +127,83 @@ class DigitalHumanSynthesisThread(threading.Thread):
             self.task.llm_response_audio_chunk_queue.put(None)
             self.task.llm_virtual_image_queue.put(None)
 
-    def do_tts(self, text, max_retries=3):
-        """执行TTS合成，带重试机制"""
-        for attempt in range(max_retries):
+    def _process_audio_and_generate_frames(self, audio, context):
+        """按640采样点切分音频，并以批次为单位生成对应的视频帧"""
+        total_frames = len(audio)
+        num_chunks = total_frames // 640
+        batch_size = self.model.config.inference_batch_size
+        # 并行渲染时每次处理 workers 个批次，由工作线程池并发渲染、按序产出
+        render = self.model.process_frames
+        step = batch_size
+        if self.model.render_pool is not None:
+            render = self.model.render_pool.render
+            step = batch_size * self.model.render_pool.workers
+        stride = self.task.inference_stride or self.model.config.inference_stride
+        speech = self.vad.speech_mask(audio, 640) if self.vad is not None else None
+
+        for batch_start in range(0, num_chunks, step):
+            if self.stop_event.is_set():
+                break
+
+            frame_numbers = range(batch_start, min(batch_start + step, num_chunks))
+
+            # 按呈现截止时间调度时先放入本批次的音频块，播放不必等待推理，赶不上的帧由调度跳过；
+            # 否则每帧的音频块随该帧一起放入队列，保持逐帧处理时的音视频同步
+            queued = 0
+            if self.clock is not None:
+                self._queue_audio(audio, frame_numbers)
+                queued = len(frame_numbers)
+
             try:
-                print(f"TTS合成尝试 {attempt + 1}/{max_retries}: {text[:50]}...")
-                
-                audio_data, raw_features = self.cosyvoice_grpc_client.inference("100", tts_text=text)
-                
-                if not audio_data or not raw_features:
-                    raise Exception("TTS返回空数据")
-                
-                audio_array = np.frombuffer(audio_data, dtype=np.float32)
-                features = np.frombuffer(raw_features, dtype=np.float32).reshape(-1, 2, 1024)
-                
-                print(f"TTS合成成功: 音频长度={len(audio_array)}, 特征形状={features.shape}")
-                return audio_array, features
-                
+                img_indices = [i % self.model.len_img for i in frame_numbers]
+                active = None if speech is None else speech[batch_start:batch_start + len(frame_numbers)]
+                speaking = [True] * len(frame_numbers) if active is None else [bool(a) for a in active]
+                samples = [self._sample_base + i * 640 for i in frame_numbers]
+                hold, batch_stride = None, stride
+                if self.scheduler is not None:
+                    hold, batch_stride = self.scheduler.plan(frame_numbers, samples, speaking, stride)
+
+                held = 0 if hold is None else sum(hold)
+                voiced = [n for k, n in enumerate(frame_numbers) if speaking[k] and not (hold and hold[k])]
+                interpolated = sum(1 for n in voiced if n % batch_stride)
+                self.render_stats.inferred_frames += len(voiced) - interpolated
+                self.render_stats.interpolated_frames += interpolated
+                self.render_stats.held_frames += held
+                self.render_stats.skipped_frames += len(frame_numbers) - len(voiced) - held
+
+                started = time.monotonic()
+                for sample, img in zip(samples, render(img_indices, frame_numbers, batch_size, active=active,
+                                                       stride=batch_stride, hold=hold, context=context)):
+                    if queued < len(frame_numbers):
+                        self._queue_audio(audio, frame_numbers[queued:queued + 1])
+                        queued += 1
+                    if img is not None:
+                        self.task.llm_virtual_image_queue.put(
+                            img if self.clock is None else ScheduledFrame(img, sample))
+                if self.scheduler is not None:
+                    self.scheduler.record(len(voiced) - interpolated, time.monotonic() - started)
             except Exception as e:
-                print(f"TTS合成失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                
-                if attempt == max_retries - 1:
-                    # 最后一次尝试失败，抛出异常
-                    raise Exception(f"TTS合成失败，已重试{max_retries}次: {str(e)}")
-                
-                # 等待一段时间后重试
-                import time
-                time.sleep(1.0 * (attempt + 1))  # 递增等待时间
-                
-        return None, None
+                print("模型异常:", e)
+            # 渲染失败时仍放入剩余的音频块，保证语音完整
+            self._queue_audio(audio, frame_numbers[queued:])
+
+        if total_frames % 640 > 0:
+            chunk = audio[num_chunks * 640:]
+            if chunk.size > 0:
+                self.task.llm_response_audio_chunk_queue.put(chunk)
+        self._sample_base += total_frames
+
+    def _queue_audio(self, audio, frame_numbers):
+        """放入各帧对应的640采样点音频块"""
+        for i in frame_numbers:
+            start = i * 640
+            end = start + 640
+            chunk = audio[start:end]
+            self.task.llm_response_audio_chunk_queue.put(chunk)
+
+    def do_tts(self, text, max_retries=3):
+        """执行TTS合成，带重试机制"""
+        return synthesize_speech(self.cosyvoice_grpc_client, text, max_retries=max_retries)
 
     def stop(self):
         """停止合成线程"""
@@ -0,0 +1,113 @@
+"""
+Digital Human SDK - Frame Deadline Scheduling
+
+以音频播放为时钟：每个视频帧对应的音频块开始播放的时刻即该帧的呈现截止时间。
+合成线程据此跳过已赶不上截止时间的帧的推理（重复上一帧或降为隔帧推理），
+引擎显示时丢弃已过期的帧，负载过高时画面平滑降级而不是越来越落后于声音。
+"""
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+
+class PlaybackClock:
+    """音频播放时钟：采样点位置 -> 播放时刻（time.monotonic()）
+
+    由音频播放线程在每次写入声卡前调用 on_write()。写入会阻塞到缓冲区有空位，
+    因此已写入的采样点数近似等于播放位置；写入时若缓冲区已播空（TTS未跟上），
+    时钟以当前时刻重新对齐。
+    """
+
+    def __init__(self, sample_rate: int = 16000):
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._anchor: Optional[Tuple[float, int]] = None  # (时刻, 采样点位置)
+        self._written = 0
+
+    @property
+    def started(self) -> bool:
+        return self._anchor is not None
+
+    def on_write(self, num_samples: int):
+        """即将写入 num_samples 个采样点"""
+        now = time.monotonic()
+        with self._lock:
+            if self._anchor is None or now > self._time_of(self._written):
+                self._anchor = (now, self._written)
+            self._written += num_samples
+
+    def _time_of(self, sample: int) -> float:
+        anchor_time, anchor_sample = self._anchor
+        return anchor_time + (sample - anchor_sample) / self.sample_rate
+
+    def deadline(self, sample: int) -> Optional[float]:
+        """第 sample 个采样点的播放时刻；播放尚未开始时返回 None（无截止时间）"""
+        with self._lock:
+            if self._anchor is None:
+                return None
+            return self._time_of(sample)
+
+
+class ScheduledFrame:
+    """放入视频队列的帧及其音频位置（对应音频块的起始采样点）"""
+    __slots__ = ("frame", "sample")
+
+    def __init__(self, frame, sample: int):
+        self.frame = frame
+        self.sample = sample
+
+    def release(self):
+        release = getattr(self.frame, "release", None)
+        if release is not None:
+            release()
+
+
+class FrameScheduler:
+    """按呈现截止时间安排每批帧的推理
+
+    用推理耗时的滑动平均估计每帧完成时刻，预计赶不上截止时间（含 slack 容差）的帧不推理：
+    - hold: 重复上一帧；
+    - interpolate: 先尝试把本批降为隔帧推理（stride 至少为2），仍赶不上的帧再重复上一帧。
+    """
+
+    def __init__(self, clock: PlaybackClock, policy: str = "hold", slack: float = 0.04,
+                 smoothing: float = 0.2):
+        self.clock = clock
+        self.policy = policy
+        self.slack = slack
+        self.smoothing = smoothing
+        self.frame_cost: Optional[float] = None  # 每个推理帧的平均耗时（秒）
+
+    def plan(self, frame_numbers: Sequence[int], samples: Sequence[int], voiced: Sequence[bool],
+             stride: int = 1) -> Tuple[List[bool], int]:
+        """返回 (hold, stride)：hold[k] 为 True 的帧不推理、重复上一帧"""
+        hold = self._plan(frame_numbers, samples, voiced, stride)
+        if any(hold) and self.policy == "interpolate" and stride == 1:
+            stride = 2
+            hold = self._plan(frame_numbers, samples, voiced, stride)
+        return hold, stride
+
+    def _plan(self, frame_numbers, samples, voiced, stride):
+        hold = [False] * len(frame_numbers)
+        if self.frame_cost is None:
+            return hold
+        finish = time.monotonic()
+        for k, (n, sample, speaking) in enumerate(zip(frame_numbers, samples, voiced)):
+            deadline = self.clock.deadline(sample)
+            # 静音帧和插值帧几乎不耗时，只有关键帧计入推理耗时
+            cost = self.frame_cost if speaking and n % stride == 0 else 0.0
+            if deadline is not None and finish + cost > deadline + self.slack:
+                hold[k] = True
+            else:
+                finish += cost
+        return hold
+
+    def record(self, inferred: int, elapsed: float):
+        """记录一批的推理帧数与总耗时"""
+        if inferred <= 0:
+            return
+        cost = elapsed / inferred
+        if self.frame_cost is None:
+            self.frame_cost = cost
+        else:
+            self.frame_cost += self.smoothing * (cost - self.frame_cost)
@@ -0,0 +1,3 @@
+"""
+Digital Human SDK - Tools
+"""
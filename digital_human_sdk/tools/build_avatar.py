@@ -0,0 +1,56 @@
+"""
+Digital Human SDK - Avatar Bundle Builder
+
+用法::
+
+    python -m digital_human_sdk.tools.build_avatar ./assets/data -o ./assets/avatar.dhav
+    python -m digital_human_sdk.tools.build_avatar --verify ./assets/avatar.dhav
+"""
+import argparse
+import sys
+import time
+
+from ..video.avatar_bundle import AvatarBundle, build_avatar_bundle
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="将散装数据集目录打包为单文件形象包")
+    parser.add_argument('source',
+                        type=str,
+                        help='数据集目录（包含 full_body_img/ 和 landmarks/），或 --verify 时的形象包路径')
+    parser.add_argument('-o', '--output',
+                        type=str,
+                        default=None,
+                        help='输出形象包路径，默认 <source>.dhav')
+    parser.add_argument('--format',
+                        default='jpeg',
+                        choices=['jpeg', 'raw'],
+                        help='底图存储格式：jpeg 体积小，raw 打开后无需解码')
+    parser.add_argument('--workers',
+                        type=int,
+                        default=None,
+                        help='并行构建线程数，默认CPU核数')
+    parser.add_argument('--verify',
+                        action='store_true',
+                        help='仅校验已有形象包的校验和')
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        bundle = AvatarBundle(args.source)
+    else:
+        output = args.output or args.source.rstrip("/\\") + ".dhav"
+        start = time.time()
+        bundle = build_avatar_bundle(args.source, output, frame_format=args.format, workers=args.workers)
+        print(f"形象包构建完成: {output}, {bundle.frame_count} 帧, "
+              f"{bundle.width}x{bundle.height}, 用时 {time.time() - start:.2f}s")
+
+    bad = bundle.verify()
+    if bad:
+        print(f"校验失败的section: {', '.join(bad)}")
+        return 1
+    print("校验通过")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Digital Human SDK - Checkpoint Converter
+
+将训练得到的 .pth 权重转换为推理用的权重文件：BN已折叠进卷积、张量为 channels_last 布局、
+附带网络宽度等元数据。加载时直接内存映射文件中的张量（checkpoint_mmap），
+不再反序列化后复制进网络，多个进程加载同一文件时共享同一份物理内存。
+
+用法::
+
+    python -m digital_human_sdk.tools.convert_checkpoint ./assets/weight/trained.pth -o ./assets/weight/trained.infer.pth
+    python -m digital_human_sdk.tools.convert_checkpoint ./assets/weight/trained.pth --asr wenet
+"""
+import argparse
+import os
+import sys
+import time
+
+import torch
+
+from ..config.config import Config
+from ..video.backends import AUDIO_SHAPES
+from ..video.backends.torch_backend import FUSE_BN_TOLERANCE, load_network
+from ..video.unet import check_fused_parity, save_checkpoint
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="将训练权重转换为可内存映射加载的推理权重")
+    parser.add_argument('source',
+                        type=str,
+                        help='训练得到的权重文件（.pth）')
+    parser.add_argument('-o', '--output',
+                        type=str,
+                        default=None,
+                        help='输出路径，默认 <source>.infer.pth')
+    parser.add_argument('--asr',
+                        default='hubert',
+                        choices=['hubert', 'wenet'],
+                        help='权重对应的音频特征类型')
+    parser.add_argument('--no-fuse-bn',
+                        action='store_true',
+                        help='不折叠BatchNorm')
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.source)[0] + ".infer.pth"
+    start = time.time()
+    config = Config(checkpoint_path=args.source, asr_type=args.asr, fuse_bn=not args.no_fuse_bn,
+                    checkpoint_mmap=False)
+    net = load_network(config, torch.device("cpu"))
+    net.to(memory_format=torch.channels_last)
+    fused_bn = save_checkpoint(net, output)
+    print(f"权重转换完成: {output}, BN折叠: {'是' if fused_bn else '否'}, 用时 {time.time() - start:.2f}s")
+
+    # 以内存映射方式重新加载，与转换前的网络比较输出
+    reloaded = load_network(Config(checkpoint_path=output, asr_type=args.asr, checkpoint_mmap=True),
+                            torch.device("cpu"))
+    max_error = check_fused_parity(net, reloaded, AUDIO_SHAPES[args.asr])
+    if max_error > FUSE_BN_TOLERANCE:
+        print(f"校验失败: 重新加载后最大输出误差 {max_error:.2e}")
+        return 1
+    print(f"校验通过，最大输出误差 {max_error:.2e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Digital Human SDK - Offline Video Renderer
+
+用法::
+
+    python -m digital_human_sdk.tools.render_video "你好，我是数字人助手。" -o ./output/answer.mp4
+    python -m digital_human_sdk.tools.render_video --text-file answer.txt -o ./output/answer.mp4 --workers 4
+    python -m digital_human_sdk.tools.render_video --audio speech.wav --features speech.npy -o ./output/speech.mp4
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from ..config.config import Config
+from ..offline import OfflineRenderer, read_wav
+from ..video.autotune import autotune
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线渲染数字人视频（MP4 + WAV），不受实时播放速度限制")
+    parser.add_argument('text',
+                        type=str,
+                        nargs='?',
+                        default=None,
+                        help='要播报的文本')
+    parser.add_argument('--text-file',
+                        type=str,
+                        default=None,
+                        help='从文件读取要播报的文本（UTF-8）')
+    parser.add_argument('--audio',
+                        type=str,
+                        default=None,
+                        help='已合成的语音（16kHz单声道WAV），与 --features 一起使用时跳过TTS')
+    parser.add_argument('--features',
+                        type=str,
+                        default=None,
+                        help='已合成语音的音频特征（.npy）')
+    parser.add_argument('-o', '--output',
+                        type=str,
+                        default='./output.mp4',
+                        help='输出MP4路径，音频写入同名 .wav')
+    parser.add_argument('--checkpoint',
+                        type=str,
+                        default=None,
+                        help='模型权重路径')
+    parser.add_argument('--dataset',
+                        type=str,
+                        default=None,
+                        help='形象数据目录')
+    parser.add_argument('--avatar-bundle',
+                        type=str,
+                        default=None,
+                        help='单文件形象包（.dhav）')
+    parser.add_argument('--workers',
+                        type=int,
+                        default=None,
+                        help='并行渲染的工作线程数')
+    parser.add_argument('--batch-size',
+                        type=int,
+                        default=None,
+                        help='推理批大小')
+    parser.add_argument('--stride',
+                        type=int,
+                        default=None,
+                        help='每隔几帧推理一次，中间帧插值')
+    parser.add_argument('--tts-concurrency',
+                        type=int,
+                        default=None,
+                        help='同时请求TTS的句数')
+    parser.add_argument('--tts-host',
+                        type=str,
+                        default=None,
+                        help='TTS服务地址')
+    parser.add_argument('--tts-port',
+                        type=int,
+                        default=None,
+                        help='TTS服务端口')
+    parser.add_argument('--no-mux',
+                        action='store_true',
+                        help='不调用 ffmpeg 合并音轨')
+    parser.add_argument('--autotune',
+                        action='store_true',
+                        help='使用（或生成）本机调优结果')
+    args = parser.parse_args(argv)
+
+    overrides = {
+        'checkpoint_path': args.checkpoint,
+        'dataset_path': args.dataset,
+        'avatar_bundle_path': args.avatar_bundle,
+        'render_workers': args.workers,
+        'inference_batch_size': args.batch_size,
+        'inference_stride': args.stride,
+        'offline_tts_concurrency': args.tts_concurrency,
+        'tts_server_host': args.tts_host,
+        'tts_server_port': args.tts_port,
+    }
+    config = Config(**{k: v for k, v in overrides.items() if v is not None})
+    config.offline_mux_audio = not args.no_mux
+    config.autotune = args.autotune
+    if not config.validate():
+        return 1
+    if config.autotune:
+        config = autotune(config)
+
+    renderer = OfflineRenderer(config)
+    try:
+        if args.audio or args.features:
+            if not (args.audio and args.features):
+                parser.error('--audio 与 --features 需要同时提供')
+            segments = [(read_wav(args.audio), np.load(args.features))]
+            renderer.render_segments(segments, args.output)
+        else:
+            text = args.text
+            if args.text_file:
+                with open(args.text_file, encoding='utf-8') as f:
+                    text = f.read()
+            if not text:
+                parser.error('需要提供文本、--text-file 或 --audio/--features')
+            renderer.render_text(text, args.output)
+    finally:
+        renderer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,5 +2,6 @@
 Digital Human SDK - Utils Module
 """
 from .file_utils import load_wav, read_lists, read_json_lists, ensure_dir, validate_file_exists
+from .vad import VoiceActivityDetector
 
-__all__ = ["load_wav", "read_lists", "read_json_lists", "ensure_dir", "validate_file_exists"]
\ No newline at end of file
+__all__ = ["load_wav", "read_lists", "read_json_lists", "ensure_dir", "validate_file_exists", "VoiceActivityDetector"]
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+Digital Human SDK - Voice Activity Detection
+
+按视频帧对应的音频块（默认640采样点，即16kHz下的40ms）计算能量，
+带迟滞判定有声/静音，用于在停顿处跳过口型推理。
+"""
+import numpy as np
+
+
+class VoiceActivityDetector:
+    """基于块能量的轻量VAD
+
+    - 能量高于 threshold_db 时立即进入有声状态；
+    - 能量连续 hangover 块低于 threshold_db - hysteresis_db 后才回到静音状态；
+    - 最后将有声区间向两侧各扩展 padding 块，覆盖口型在发声前后的过渡。
+    """
+
+    def __init__(self, threshold_db: float = -40.0, hysteresis_db: float = 6.0,
+                 hangover: int = 5, padding: int = 3):
+        self.threshold_db = threshold_db
+        self.release_db = threshold_db - hysteresis_db
+        self.hangover = hangover
+        self.padding = padding
+
+    @staticmethod
+    def chunk_energy_db(audio: np.ndarray, chunk_size: int) -> np.ndarray:
+        """每个完整音频块的RMS能量（dBFS）"""
+        num_chunks = len(audio) // chunk_size
+        chunks = np.asarray(audio[:num_chunks * chunk_size], dtype=np.float32).reshape(num_chunks, chunk_size)
+        rms = np.sqrt(np.mean(np.square(chunks, dtype=np.float64), axis=1))
+        return 20 * np.log10(rms + 1e-10)
+
+    def speech_mask(self, audio: np.ndarray, chunk_size: int = 640) -> np.ndarray:
+        """返回每个完整音频块是否为有声的布尔数组"""
+        energy = self.chunk_energy_db(audio, chunk_size)
+        mask = np.zeros(len(energy), dtype=bool)
+        speaking = False
+        quiet = 0
+        for i, db in enumerate(energy):
+            if db >= self.threshold_db:
+                speaking, quiet = True, 0
+            elif speaking and db < self.release_db:
+                quiet += 1
+                if quiet > self.hangover:
+                    speaking = False
+            elif speaking:
+                quiet = 0
+            mask[i] = speaking
+
+        if self.padding > 0 and mask.any():
+            # 双向扩展：膨胀后的有声区间 = 原区间 ± padding
+            kernel = np.ones(2 * self.padding + 1, dtype=int)
+            mask = np.convolve(mask.astype(int), kernel, mode="same") > 0
+        return mask
@@ -1,7 +1,17 @@
 """
 Digital Human SDK - Video Module
 """
-from .video_model import VideoModel
+from .video_model import VideoModel, RenderContext
 from .unet import Model
+from .frame_cache import FrameCache
+from .landmarks import LandmarkIndex
+from .avatar_bundle import AvatarBundle, build_avatar_bundle
+from .backends import InferenceBackend, create_backend
+from .compositor import FrameCompositor
+from .render_pool import RenderWorkerPool
+from .avatar_registry import AvatarRegistry
+from .autotune import Autotuner, autotune
 
-__all__ = ["VideoModel", "Model"]
\ No newline at end of file
+__all__ = ["VideoModel", "RenderContext", "Model", "FrameCache", "LandmarkIndex", "AvatarBundle", "build_avatar_bundle",
+           "InferenceBackend", "create_backend", "FrameCompositor", "RenderWorkerPool",
+           "AvatarRegistry", "Autotuner", "autotune"]
\ No newline at end of file
@@ -0,0 +1,290 @@
+"""
+Digital Human SDK - Startup Autotuner
+
+渲染速度高度依赖主机：推理后端（eager / TorchScript / torch.compile / ONNX Runtime）、精度、
+批大小以及 torch / OpenCV 的线程数，最优组合因CPU型号、核数和运行时版本而异。
+调优在时间预算内用已加载形象的真实渲染路径逐项测量候选设置，选出最快的组合，
+写入按主机区分的配置档案；之后的启动直接复用档案中的结果。
+"""
+import hashlib
+import itertools
+import json
+import os
+import platform
+import time
+from dataclasses import replace
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from .backends import AUDIO_SHAPES, checkpoint_digest, create_backend
+from .render_pool import available_cpus
+from .video_model import AUDIO_WINDOW, VideoModel
+from ..config.config import Config
+from ..exceptions import ConfigurationError
+
+BACKEND_VARIANTS = {
+    "torch": {"inference_backend": "torch", "torch_compile": "none"},
+    "torch-trace": {"inference_backend": "torch", "torch_compile": "trace"},
+    "torch-compile": {"inference_backend": "torch", "torch_compile": "compile"},
+    "onnx": {"inference_backend": "onnx", "torch_compile": "none"},
+}
+BACKEND_NAMES = {(v["inference_backend"], v["torch_compile"]): k for k, v in BACKEND_VARIANTS.items()}
+BATCH_SIZES = (1, 2, 4, 8, 16)
+# 吞吐与最优批大小相差不超过该比例时取较小的批（首帧延迟更低）
+BATCH_TOLERANCE = 1.05
+# 每个候选设置测量的帧数
+BENCH_FRAMES = 32
+PROFILE_VERSION = 1
+
+
+def host_fingerprint() -> Dict[str, str]:
+    """决定渲染速度的主机特征：CPU型号与可用核数、GPU、推理运行时版本"""
+    cpu = platform.processor() or platform.machine()
+    if os.path.exists("/proc/cpuinfo"):
+        with open("/proc/cpuinfo", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    cpu = line.split(":", 1)[1].strip()
+                    break
+    info = {"host": platform.node(), "machine": platform.machine(), "cpu": cpu,
+            "cpus": str(len(available_cpus()))}
+    try:
+        import torch
+        info["torch"] = torch.__version__
+        if torch.cuda.is_available():
+            info["gpu"] = torch.cuda.get_device_name(0)
+    except ImportError:
+        pass
+    try:
+        import onnxruntime
+        info["onnxruntime"] = onnxruntime.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def profile_path(config: Config, fingerprint: Optional[Dict[str, str]] = None) -> str:
+    """本机配置档案路径：档案目录可在多台主机间共享，文件名由主机特征区分"""
+    fingerprint = fingerprint or host_fingerprint()
+    host_id = hashlib.sha1(json.dumps(fingerprint, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(config.autotune_profile_dir or config.model_cache_dir, f"autotune_{host_id}.json")
+
+
+def workload_key(config: Config) -> str:
+    """档案中的记录键：权重、形象、输出格式与候选范围相同时测量结果可复用"""
+    avatar = config.avatar_bundle_path or config.dataset_path
+    parts = [checkpoint_digest(str(config.checkpoint))[:16], config.asr, os.path.abspath(avatar), config.device,
+             config.output_mode, str(config.output_size), config.output_pixel_format, str(config.inference_stride),
+             ",".join(config.autotune_backends), ",".join(config.autotune_precisions)]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def _describe(settings: dict) -> str:
+    return ", ".join(f"{k}={v}" for k, v in settings.items())
+
+
+def _summary(config: Config) -> dict:
+    """日志中展示的调优相关设置"""
+    summary = {"backend": BACKEND_NAMES.get((config.inference_backend, config.torch_compile), config.inference_backend),
+               "precision": config.precision, "batch": config.inference_batch_size}
+    threads = config.onnx_num_threads if config.inference_backend == "onnx" else config.torch_num_threads
+    if threads:
+        summary["threads"] = threads
+    if config.opencv_num_threads:
+        summary["opencv_threads"] = config.opencv_num_threads
+    return summary
+
+
+def _thread_key(settings: dict) -> str:
+    return "onnx_num_threads" if settings["inference_backend"] == "onnx" else "torch_num_threads"
+
+
+class Autotuner:
+    """在时间预算内逐阶段贪心地测量候选设置
+
+    后端与精度 -> 批大小 -> 推理线程数 -> OpenCV线程数，每一阶段在前一阶段的最优设置上进行；
+    每个候选开始前检查预算：剩余时间不够再测量一次（按上一次测量的耗时估计）时停止（第一个候选总会测量）。
+    """
+
+    def __init__(self, model: VideoModel, budget_s: float, frames: int = BENCH_FRAMES):
+        self.model = model
+        self.budget_s = budget_s
+        self.frames = frames
+        self.indices = [i % model.len_img for i in range(frames)]
+        # 测量只关心耗时，用固定种子的随机特征代替真实音频
+        row = int(np.prod(AUDIO_SHAPES[model.mode])) // AUDIO_WINDOW
+        self.features = np.random.default_rng(0).standard_normal((frames, row)).astype(np.float32)
+        self._deadline = None
+        # 上一次创建后端、上一次测量（预热 + 计时）的耗时
+        self._create_s = 0.0
+        self._measure_s = 0.0
+
+    def _expired(self, create: bool = False) -> bool:
+        """剩余预算不够再测量一次（create 为 True 时还要创建后端）"""
+        cost = self._measure_s + (self._create_s if create else 0.0)
+        return time.monotonic() + cost > self._deadline
+
+    def _create_backend(self, settings: dict):
+        """按候选设置创建推理后端；当前环境不支持的候选返回 None"""
+        config = replace(self.model.config, **settings)
+        calibration_path = config.calibration_audio_path
+        if config.precision == "int8-static" and not (calibration_path and os.path.exists(calibration_path)):
+            print(f"[调优] 跳过 {_describe(settings)}: 未配置校准音频特征文件")
+            return config, None
+        started = time.monotonic()
+        try:
+            return config, create_backend(config, calibration=self.model._calibration_batches)
+        except (ImportError, ConfigurationError, RuntimeError, OSError) as e:
+            print(f"[调优] 跳过 {_describe(settings)}: {e}")
+            return config, None
+        finally:
+            self._create_s = time.monotonic() - started
+
+    def _measure(self, config: Config, backend, batch_size: int) -> float:
+        """按批大小渲染 frames 帧（整帧输出），返回每帧耗时（秒）"""
+        started = time.monotonic()
+        trial = self.model.clone_with_backend(backend, config)
+        context = trial.create_context(self.features)
+        # 预热：编码全部测量帧（稳态下编码器特征命中缓存）并渲染一批，完成编译与缓冲区分配
+        trial._get_face_encodings(sorted(set(self.indices)), backend)
+        for _ in trial.process_frames(self.indices[:batch_size], range(batch_size), batch_size, pooled=False,
+                                      backend=backend, context=context):
+            pass
+        start = time.perf_counter()
+        for _ in trial.process_frames(self.indices, range(self.frames), batch_size, pooled=False,
+                                      backend=backend, context=context):
+            pass
+        frame_s = (time.perf_counter() - start) / self.frames
+        self._measure_s = time.monotonic() - started
+        print(f"[调优] {_describe(_summary(config))}: {frame_s * 1000:.1f} ms/帧, "
+              f"RTF {frame_s * self.model.fps:.2f}")
+        return frame_s
+
+    def run(self) -> dict:
+        """执行调优，返回档案记录 {"settings", "frame_ms", "rtf", "realtime", "measured_at"}"""
+        self._deadline = time.monotonic() + self.budget_s
+        config = self.model.config
+        cpus = len(available_cpus())
+        batch_size = config.inference_batch_size
+
+        # 1. 后端与精度：使用配置的批大小与全部可用核
+        best = None  # (每帧耗时, 设置, 后端)
+        for name, precision in itertools.product(config.autotune_backends, config.autotune_precisions):
+            if best is not None and self._expired(create=True):
+                break
+            settings = dict(BACKEND_VARIANTS[name], precision=precision, inference_batch_size=batch_size)
+            settings[_thread_key(settings)] = cpus
+            trial_config, backend = self._create_backend(settings)
+            if backend is None:
+                continue
+            frame_s = self._measure(trial_config, backend, batch_size)
+            if best is None or frame_s < best[0]:
+                best = (frame_s, settings, backend)
+        if best is None:
+            raise ConfigurationError("自动调优没有可用的候选后端")
+        frame_s, settings, backend = best
+        # 线程数只影响CPU推理（ONNX Runtime 后端只使用CPU）
+        on_cpu = getattr(getattr(backend, "device", None), "type", "cpu") == "cpu"
+
+        # 2. 批大小：复用已创建的后端
+        timings = {batch_size: frame_s}
+        for size in BATCH_SIZES:
+            if size in timings or self._expired():
+                continue
+            timings[size] = self._measure(replace(self.model.config, **dict(settings, inference_batch_size=size)),
+                                          backend, size)
+        fastest = min(timings.values())
+        batch_size = min(size for size, t in timings.items() if t <= fastest * BATCH_TOLERANCE)
+        settings["inference_batch_size"] = batch_size
+        frame_s = timings[batch_size]
+
+        if on_cpu:
+            # 3. 推理线程数：线程过多时调度与同步开销可能超过收益
+            key = _thread_key(settings)
+            for threads in sorted({max(1, cpus // 2), max(1, cpus // 4)} - {cpus}, reverse=True):
+                if self._expired(create=True):
+                    break
+                candidate = dict(settings, **{key: threads})
+                trial_config, candidate_backend = self._create_backend(candidate)
+                if candidate_backend is None:
+                    continue
+                candidate_s = self._measure(trial_config, candidate_backend, batch_size)
+                if candidate_s < frame_s:
+                    frame_s, settings, backend = candidate_s, candidate, candidate_backend
+            if settings["inference_backend"] == "torch":
+                # torch线程数为进程级设置，恢复为选中的值
+                import torch
+                torch.set_num_threads(settings["torch_num_threads"])
+
+            # 4. OpenCV线程数（缩放、合成、插值），同样为进程级设置，测量后恢复
+            default_threads = cv2.getNumThreads()
+            trial_config = replace(self.model.config, **settings)
+            for threads in sorted({1, cpus} - {default_threads}):
+                if self._expired():
+                    break
+                cv2.setNumThreads(threads)
+                try:
+                    candidate_s = self._measure(trial_config, backend, batch_size)
+                finally:
+                    cv2.setNumThreads(default_threads)
+                if candidate_s < frame_s:
+                    frame_s, settings = candidate_s, dict(settings, opencv_num_threads=threads)
+
+        rtf = frame_s * self.model.fps
+        return {"settings": settings, "frame_ms": round(frame_s * 1000, 2), "rtf": round(rtf, 3),
+                "realtime": rtf <= 1.0, "measured_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+
+
+def load_profile(path: str) -> dict:
+    """读取配置档案，不存在或版本不符时返回空档案"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            profile = json.load(f)
+        if profile.get("version") == PROFILE_VERSION:
+            return profile
+    except (OSError, ValueError):
+        pass
+    return {"version": PROFILE_VERSION, "host": host_fingerprint(), "entries": {}}
+
+
+def save_profile(path: str, profile: dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def autotune(config: Config) -> Config:
+    """返回应用本机调优结果后的配置
+
+    档案中已有相同权重、形象和候选范围的记录时直接复用；否则加载形象测量（额外加载一次形象），
+    并把结果写入档案。
+    """
+    fingerprint = host_fingerprint()
+    path = profile_path(config, fingerprint)
+    key = workload_key(config)
+    profile = load_profile(path)
+    entry = profile["entries"].get(key)
+    if entry is None:
+        print(f"开始自动调优，时间预算 {config.autotune_budget_s:.0f}s")
+        start = time.time()
+        # 预算包含加载形象的时间
+        model = VideoModel(replace(config, render_workers=1, frame_pool_size=0, frame_cache_preload=False,
+                                   encoder_cache_persist=False, precision_report=False))
+        try:
+            entry = Autotuner(model, config.autotune_budget_s - (time.time() - start)).run()
+        finally:
+            model.close()
+        profile["host"] = fingerprint
+        profile["entries"][key] = entry
+        save_profile(path, profile)
+        print(f"自动调优完成，用时 {time.time() - start:.1f}s，结果已写入 {path}")
+    else:
+        print(f"复用本机调优结果: {path}（{entry['measured_at']}）")
+    tuned = replace(config, **entry["settings"])
+    print(f"调优设置: {_describe(_summary(tuned))}; 预计 {entry['frame_ms']:.1f} ms/帧，实时率 RTF {entry['rtf']:.2f}"
+          f"{'' if entry['realtime'] else '（无法实时渲染，考虑 inference_stride=2 或更多渲染工作线程）'}")
+    return tuned
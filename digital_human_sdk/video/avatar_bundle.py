@@ -0,0 +1,188 @@
+"""
+Digital Human SDK - Packed Avatar Bundle
+
+单文件数字人形象包（.dhav），布局如下::
+
+    [8B magic][4B version][4B header_len][header JSON][padding]
+    [section 0][padding][section 1]...
+
+每个section按页大小对齐，可直接以 np.memmap 零拷贝访问，按需换页。
+section 包括底图（raw 或 JPEG）、关键点/裁剪框索引表和预裁剪的168x168人脸图。
+"""
+import json
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .landmarks import LandmarkIndex, crop_box, parse_lms
+
+BUNDLE_MAGIC = b"DHAVATAR"
+BUNDLE_VERSION = 1
+BUNDLE_SUFFIX = ".dhav"
+FACE_PATCH_SIZE = 168
+_PREFIX = struct.Struct("<8sII")
+_ALIGN = 4096
+
+
+def _align(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def crop_face(img: np.ndarray, box: Tuple[int, int, int, int]) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """按裁剪框截取人脸并缩放到168x168，同时返回原始裁剪尺寸 (h, w)"""
+    xmin, ymin, xmax, ymax = box
+    crop_img = img[ymin:ymax, xmin:xmax]
+    h, w = crop_img.shape[:2]
+    crop_img = cv2.resize(crop_img, (FACE_PATCH_SIZE, FACE_PATCH_SIZE), cv2.INTER_AREA)
+    return crop_img, (h, w)
+
+
+class AvatarBundle:
+    """只读打开的形象包，所有数组均为 memmap 视图"""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            magic, version, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != BUNDLE_MAGIC:
+                raise ValueError(f"不是有效的形象包文件: {self.path}")
+            if version != BUNDLE_VERSION:
+                raise ValueError(f"不支持的形象包版本: {version}")
+            self.header = json.loads(f.read(header_len).decode("utf-8"))
+
+        self.frame_count = self.header["frame_count"]
+        self.height = self.header["height"]
+        self.width = self.header["width"]
+        self.frame_format = self.header["frame_format"]
+
+        self._mm = np.memmap(self.path, dtype=np.uint8, mode="r")
+        self.sections = {name: self._section(name) for name in self.header["sections"]}
+        self.landmarks = LandmarkIndex(self.sections["landmark_table"])
+        self.face_patches = self.sections["face_patches"]
+
+    def _section(self, name: str) -> np.ndarray:
+        info = self.header["sections"][name]
+        raw = self._mm[info["offset"]:info["offset"] + info["nbytes"]]
+        return raw.view(np.dtype(info["dtype"])).reshape(info["shape"])
+
+    def frame(self, idx: int) -> Optional[np.ndarray]:
+        """获取第idx帧底图（raw格式为只读视图，JPEG格式为新解码数组）"""
+        if self.frame_format == "raw":
+            return self.sections["frames"][idx]
+        offsets = self.sections["jpeg_offsets"]
+        data = self.sections["jpeg_data"][offsets[idx]:offsets[idx + 1]]
+        return cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+    def verify(self) -> List[str]:
+        """重新计算各section的CRC32，返回校验失败的section名"""
+        bad = []
+        for name, info in self.header["sections"].items():
+            raw = self._mm[info["offset"]:info["offset"] + info["nbytes"]]
+            if f"{zlib.crc32(raw):08x}" != info["crc32"]:
+                bad.append(name)
+        return bad
+
+
+def _plan_sections(specs: List[Tuple[str, str, tuple]], data_start: int) -> Tuple[Dict[str, dict], int]:
+    sections = {}
+    offset = data_start
+    for name, dtype, shape in specs:
+        nbytes = int(np.dtype(dtype).itemsize * np.prod(shape))
+        sections[name] = {"offset": offset, "nbytes": nbytes, "dtype": dtype,
+                          "shape": list(shape), "crc32": "00000000"}
+        offset = _align(offset + nbytes)
+    return sections, offset
+
+
+def build_avatar_bundle(dataset_dir: str, output_path: str, frame_format: str = "jpeg",
+                        workers: Optional[int] = None) -> AvatarBundle:
+    """由 full_body_img/ 与 landmarks/ 目录并行构建形象包
+
+    JPEG格式直接打包原始JPEG字节（无损于源文件），raw格式保存解码后的BGR像素，
+    打开后无需任何解码。
+    """
+    if frame_format not in ("jpeg", "raw"):
+        raise ValueError(f"不支持的帧格式: {frame_format}")
+    img_dir = os.path.join(dataset_dir, "full_body_img")
+    lms_dir = os.path.join(dataset_dir, "landmarks")
+    # 与 VideoModel 读取散装目录时的帧数规则保持一致
+    frame_count = len(os.listdir(img_dir)) - 1
+    img_paths = [os.path.join(img_dir, f"{i}.jpg") for i in range(frame_count)]
+
+    first = cv2.imread(img_paths[0])
+    height, width = first.shape[:2]
+    point_count = len(parse_lms(os.path.join(lms_dir, "0.lms")))
+
+    specs = []
+    if frame_format == "raw":
+        specs.append(("frames", "uint8", (frame_count, height, width, 3)))
+    else:
+        jpeg_sizes = np.array([os.path.getsize(p) for p in img_paths], dtype=np.int64)
+        jpeg_offsets = np.concatenate([[0], np.cumsum(jpeg_sizes)]).astype(np.int64)
+        specs.append(("jpeg_data", "uint8", (int(jpeg_offsets[-1]),)))
+        specs.append(("jpeg_offsets", "int64", (frame_count + 1,)))
+    specs.append(("landmark_table", "int32", (frame_count, 4 + 2 * point_count)))
+    specs.append(("face_patches", "uint8", (frame_count, FACE_PATCH_SIZE, FACE_PATCH_SIZE, 3)))
+
+    header = {"version": BUNDLE_VERSION, "frame_count": frame_count, "height": height,
+              "width": width, "frame_format": frame_format, "patch_size": FACE_PATCH_SIZE}
+    # CRC占位符与最终值等长，头部长度在回填前后保持不变
+    data_start = _align(_PREFIX.size)
+    while True:
+        header["sections"], total_size = _plan_sections(specs, data_start)
+        needed = _align(_PREFIX.size + len(json.dumps(header).encode("utf-8")))
+        if needed <= data_start:
+            break
+        data_start = needed
+
+    with open(output_path, "wb") as f:
+        f.truncate(total_size)
+    mm = np.memmap(output_path, dtype=np.uint8, mode="r+")
+
+    def view(name):
+        info = header["sections"][name]
+        raw = mm[info["offset"]:info["offset"] + info["nbytes"]]
+        return raw.view(np.dtype(info["dtype"])).reshape(info["shape"])
+
+    table = view("landmark_table")
+    patches = view("face_patches")
+    if frame_format == "raw":
+        frames = view("frames")
+    else:
+        jpeg_data = view("jpeg_data")
+        view("jpeg_offsets")[:] = jpeg_offsets
+
+    def pack(i):
+        with open(img_paths[i], "rb") as f:
+            encoded = f.read()
+        img = cv2.imdecode(np.frombuffer(encoded, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None or img.shape[:2] != (height, width):
+            raise ValueError(f"帧尺寸不一致或无法解码: {img_paths[i]}")
+        lms = parse_lms(os.path.join(lms_dir, f"{i}.lms"))
+        box = crop_box(lms)
+        table[i, :4] = box
+        table[i, 4:] = lms.reshape(-1)
+        patches[i], _ = crop_face(img, box)
+        if frame_format == "raw":
+            frames[i] = img
+        else:
+            jpeg_data[jpeg_offsets[i]:jpeg_offsets[i + 1]] = np.frombuffer(encoded, dtype=np.uint8)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        list(pool.map(pack, range(frame_count)))
+
+    for name, info in header["sections"].items():
+        info["crc32"] = f"{zlib.crc32(mm[info['offset']:info['offset'] + info['nbytes']]):08x}"
+    mm.flush()
+    del mm
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    with open(output_path, "r+b") as f:
+        f.write(_PREFIX.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+    return AvatarBundle(output_path)
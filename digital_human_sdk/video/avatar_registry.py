@@ -0,0 +1,188 @@
+"""
+Digital Human SDK - Avatar Registry
+
+一个进程服务多个形象：形象按需加载，权重相同的形象共用同一个推理后端，
+各形象的缓存（解码帧、裁剪框、编码器特征等）合计不超过全局内存预算，
+超出时按最近最少使用淘汰空闲形象；可在后台预加载。
+"""
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import replace
+from typing import Dict, Iterable, List, Optional
+
+from .backends import checkpoint_digest
+from .video_model import VideoModel
+from ..config.config import Config
+from ..exceptions import ResourceNotFoundError
+
+DEFAULT_AVATAR = "default"
+
+
+def _backend_key(config: Config) -> tuple:
+    """决定推理后端（权重及其编译/量化产物）的配置项；相同时可共用一个后端"""
+    return (checkpoint_digest(str(config.checkpoint)), config.asr, config.model_width, config.fuse_bn,
+            config.device, config.inference_backend, config.precision, config.torch_compile,
+            config.calibration_audio_path)
+
+
+class AvatarRegistry:
+    """多形象注册表（线程安全）
+
+    - register(): 登记形象，只记录配置不加载；
+    - acquire()/release(): 使用形象期间持有引用，被持有的形象不会被淘汰；
+    - get(): 获取形象（必要时加载）但不持有引用；
+    - preload(): 在后台线程中加载。
+    """
+
+    def __init__(self, base_config: Config, memory_budget_bytes: int):
+        self.base_config = base_config
+        self.memory_budget_bytes = memory_budget_bytes
+        self._configs: Dict[str, Config] = {}
+        self._resident: "OrderedDict[str, VideoModel]" = OrderedDict()
+        self._refs: Dict[str, int] = {}
+        self._loading: Dict[str, Future] = {}
+        # 只弱引用推理后端：使用它的形象全部卸载后权重随之释放
+        self._backends = weakref.WeakValueDictionary()
+        self._lock = threading.RLock()
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="avatar-loader")
+
+    def register(self, avatar_id: str, path: Optional[str] = None, **overrides) -> Config:
+        """登记形象
+
+        :param path: 形象数据目录（full_body_img/ + landmarks/）或单文件形象包（.dhav）
+        :param overrides: 覆盖该形象的其他配置项（如 checkpoint_path）
+        """
+        if path is not None:
+            if os.path.isfile(path):
+                overrides.setdefault("avatar_bundle_path", path)
+            else:
+                overrides.setdefault("dataset_path", path)
+                overrides.setdefault("avatar_bundle_path", None)
+        config = replace(self.base_config, **overrides)
+        with self._lock:
+            self._configs[avatar_id] = config
+        return config
+
+    def __contains__(self, avatar_id: str) -> bool:
+        return avatar_id in self._configs
+
+    @property
+    def avatar_ids(self) -> List[str]:
+        return list(self._configs)
+
+    @property
+    def resident(self) -> List[str]:
+        """已加载的形象，按最近使用排序（最近的在后）"""
+        with self._lock:
+            return list(self._resident)
+
+    @property
+    def cache_nbytes(self) -> int:
+        with self._lock:
+            return sum(model.cache_nbytes for model in self._resident.values())
+
+    def get(self, avatar_id: str) -> VideoModel:
+        """获取形象模型，未加载时加载（阻塞）"""
+        return self._get(avatar_id, hold=False)
+
+    def acquire(self, avatar_id: str) -> VideoModel:
+        """获取形象模型并持有引用，使用完毕后调用 release()"""
+        return self._get(avatar_id, hold=True)
+
+    def _get(self, avatar_id: str, hold: bool) -> VideoModel:
+        while True:
+            with self._lock:
+                model = self._resident.get(avatar_id)
+                if model is not None:
+                    # 查找与持有引用在同一临界区内，其间不会被并发的淘汰卸载
+                    self._resident.move_to_end(avatar_id)
+                    if hold:
+                        self._refs[avatar_id] = self._refs.get(avatar_id, 0) + 1
+                    break
+                future = self._schedule(avatar_id)
+            # 加载完成后回到临界区内取用；加载后又被淘汰时重新加载
+            future.result()
+        self._enforce_budget()
+        return model
+
+    def release(self, avatar_id: str):
+        with self._lock:
+            if self._refs.get(avatar_id, 0) > 0:
+                self._refs[avatar_id] -= 1
+            self._enforce_budget()
+
+    def preload(self, avatar_ids: Optional[Iterable[str]] = None):
+        """在后台依次加载形象（默认全部已登记的形象），不阻塞调用方"""
+        for avatar_id in (self.avatar_ids if avatar_ids is None else avatar_ids):
+            self._schedule(avatar_id)
+
+    def evict(self, avatar_id: str) -> bool:
+        """卸载空闲形象，释放其缓存；正在使用的形象不卸载"""
+        with self._lock:
+            if self._refs.get(avatar_id, 0) > 0 or avatar_id not in self._resident:
+                return False
+            model = self._resident.pop(avatar_id)
+        model.close()
+        print(f"已卸载形象: {avatar_id}")
+        return True
+
+    def _schedule(self, avatar_id: str) -> Future:
+        with self._lock:
+            if avatar_id not in self._configs:
+                raise ResourceNotFoundError(f"未登记的形象: {avatar_id}")
+            if avatar_id in self._resident:
+                future = Future()
+                future.set_result(self._resident[avatar_id])
+                return future
+            future = self._loading.get(avatar_id)
+            if future is None:
+                future = self._loading[avatar_id] = self._loader.submit(self._load, avatar_id)
+            return future
+
+    def _load(self, avatar_id: str) -> VideoModel:
+        try:
+            config = self._configs[avatar_id]
+            key = _backend_key(config)
+            with self._lock:
+                backend = self._backends.get(key)
+            model = VideoModel(config, backend=backend)
+            if config.inference_warmup and backend is None:
+                model.warmup()
+            with self._lock:
+                if backend is None:
+                    self._backends[key] = model.backend
+                else:
+                    print(f"形象 {avatar_id} 与已加载形象共用推理后端")
+                self._resident[avatar_id] = model
+            self._enforce_budget()
+            return model
+        finally:
+            with self._lock:
+                self._loading.pop(avatar_id, None)
+
+    def _enforce_budget(self):
+        """缓存合计超出预算时，按最近最少使用卸载空闲形象（最近使用的形象保留）"""
+        with self._lock:
+            total = sum(model.cache_nbytes for model in self._resident.values())
+            idle = [avatar_id for avatar_id in list(self._resident)[:-1] if self._refs.get(avatar_id, 0) == 0]
+        for avatar_id in idle:
+            if total <= self.memory_budget_bytes:
+                break
+            with self._lock:
+                model = self._resident.get(avatar_id)
+            if model is not None:
+                freed = model.cache_nbytes
+                if self.evict(avatar_id):
+                    total -= freed
+
+    def close(self):
+        """卸载全部形象"""
+        self._loader.shutdown(wait=True)
+        with self._lock:
+            models = list(self._resident.values())
+            self._resident.clear()
+        for model in models:
+            model.close()
@@ -0,0 +1,145 @@
+"""
+Digital Human SDK - Inference Backends
+
+推理后端负责UNet的全部张量计算及前后处理，VideoModel只处理uint8图像：
+
+- ``encode(patches)``: [N, 168, 168, 3] uint8 人脸图 -> 每帧一份编码器跳连特征 (x1..x5)
+- ``decode(frame_skips, audio)``: 跳连特征 + [N, *AUDIO_SHAPES[mode]] 音频窗口 -> [N, 160, 160, 3] uint8
+
+跳连特征的具体类型（torch张量或numpy数组）由后端决定，VideoModel只负责缓存。
+"""
+import copy
+import hashlib
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..avatar_bundle import FACE_PATCH_SIZE
+from ...exceptions import ConfigurationError
+
+# 每帧音频特征窗口在送入音频分支前的形状
+AUDIO_SHAPES = {"hubert": (32, 32, 32), "wenet": (256, 16, 32)}
+SKIP_NAMES = ["x1", "x2", "x3", "x4", "x5"]
+BACKENDS = ("torch", "onnx")
+
+# 网络输入为168x168人脸图的中心160x160区域
+INNER = slice(4, 164)
+# 遮挡下半脸：等价于原实现的 cv2.rectangle(img, (5, 5, 150, 145), (0, 0, 0), -1)，
+# 即 x=5, y=5, w=150, h=145 的实心矩形
+MASK_ROWS = slice(5, 150)
+MASK_COLS = slice(5, 155)
+
+_checkpoint_digests: Dict[str, str] = {}
+
+
+def checkpoint_digest(path: str) -> str:
+    """权重文件内容的SHA-256摘要（按路径、大小和mtime在进程内缓存）"""
+    stat = os.stat(path)
+    memo_key = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    digest = _checkpoint_digests.get(memo_key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        digest = _checkpoint_digests[memo_key] = sha.hexdigest()
+    return digest
+
+
+def preprocess_numpy(patches: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """uint8人脸图 [N, 168, 168, 3] -> 归一化网络输入 out[N, 6, 160, 160]（原图 + 遮挡副本）"""
+    real, masked = out[:, :3], out[:, 3:]
+    np.divide(patches[:, INNER, INNER].transpose(0, 3, 1, 2), np.float32(255.0), out=real)
+    masked[...] = real
+    masked[:, :, MASK_ROWS, MASK_COLS] = 0
+    return out
+
+
+def postprocess_numpy(preds: np.ndarray, scratch: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """0~1输出 [N, 3, 160, 160] -> uint8 [N, 160, 160, 3]（截断取整，与原实现一致）"""
+    np.multiply(preds, np.float32(255.0), out=scratch)
+    np.copyto(out, scratch.transpose(0, 2, 3, 1), casting="unsafe")
+    return out
+
+
+class InferenceBackend:
+    """推理后端基类"""
+
+    name = "base"
+    precisions = ("fp32",)
+    # 每次推理复用的批次缓冲区属性，副本中重置为 None
+    buffer_attrs: Tuple[str, ...] = ()
+
+    def __init__(self, config):
+        if config.precision not in self.precisions:
+            raise ConfigurationError(f"{self.name} 后端不支持推理精度 {config.precision}，"
+                                     f"可选: {', '.join(self.precisions)}")
+        self.config = config
+        self.mode = config.asr
+        self.precision = config.precision
+        self.audio_shape = AUDIO_SHAPES[self.mode]
+
+    @property
+    def model_key(self) -> str:
+        """与后端无关的网络标识：权重内容 + 模式 + BN折叠"""
+        return f"{checkpoint_digest(str(self.config.checkpoint))[:16]}_{self.mode}_bn{int(self.config.fuse_bn)}"
+
+    @property
+    def cache_key(self) -> str:
+        """后端产物（编码器特征等）的缓存键：网络标识 + 后端 + 精度"""
+        return f"{self.model_key}_{self.name}_{self.precision}"
+
+    def encode(self, patches: np.ndarray) -> List[object]:
+        """对uint8人脸图做归一化与遮挡后运行编码器，返回每帧的跳连特征"""
+        raise NotImplementedError
+
+    def decode(self, frame_skips: List[object], audio: np.ndarray) -> np.ndarray:
+        """运行音频分支与解码器，返回 [N, 160, 160, 3] uint8 预测
+
+        返回的数组可能是后端的复用缓冲区，在下一次调用前有效。
+        """
+        raise NotImplementedError
+
+    def replicate(self) -> "InferenceBackend":
+        """共享权重（网络/会话）、拥有独立批次缓冲区的副本，供并行渲染的工作线程使用
+
+        权重只读，副本之间可以并发推理；同一个实例不能被多个线程同时调用。
+        """
+        replica = copy.copy(self)
+        for attr in self.buffer_attrs:
+            setattr(replica, attr, None)
+        return replica
+
+    def warmup(self, batch_sizes: List[int]):
+        """以全零输入跑一遍各批大小，提前完成编译、内存分配等一次性开销"""
+        for n in batch_sizes:
+            skips = self.encode(np.zeros((n, FACE_PATCH_SIZE, FACE_PATCH_SIZE, 3), dtype=np.uint8))
+            self.decode(skips, np.zeros((n,) + self.audio_shape, dtype=np.float32))
+
+    def skips_nbytes(self, skips) -> int:
+        """单帧跳连特征占用的字节数"""
+        raise NotImplementedError
+
+    def skips_to_numpy(self, skips) -> List[np.ndarray]:
+        """导出单帧跳连特征用于持久化"""
+        raise NotImplementedError
+
+    def skips_from_numpy(self, arrays: List[np.ndarray]):
+        """从持久化数据恢复单帧跳连特征"""
+        raise NotImplementedError
+
+
+def create_backend(config, calibration: Optional[Callable[[], Iterable[Tuple[np.ndarray, np.ndarray]]]] = None
+                   ) -> InferenceBackend:
+    """按配置创建推理后端，依赖在此处按需导入
+
+    :param calibration: 返回 (uint8人脸图, audio) 批次的可调用对象，仅静态量化校准时调用
+    """
+    if config.inference_backend == "torch":
+        from .torch_backend import TorchBackend
+        return TorchBackend(config)
+    if config.inference_backend == "onnx":
+        from .onnx_backend import OnnxRuntimeBackend
+        return OnnxRuntimeBackend(config, calibration)
+    raise ConfigurationError(f"不支持的推理后端: {config.inference_backend}")
@@ -0,0 +1,187 @@
+"""
+Digital Human SDK - ONNX Runtime Inference Backend
+
+UNet拆分为编码器和音频+解码器两张图导出，batch维为动态轴。
+运行时只依赖 onnxruntime；仅在缓存目录中没有导出产物时才需要torch进行一次导出。
+"""
+import hashlib
+import os
+from typing import List
+
+import numpy as np
+import onnxruntime as ort
+
+from . import AUDIO_SHAPES, SKIP_NAMES, InferenceBackend, postprocess_numpy, preprocess_numpy
+from ...exceptions import ConfigurationError
+
+ONNX_OPSET = 17
+
+
+def export_onnx(config, encoder_path: str, decoder_path: str):
+    """将（按配置折叠BN后的）网络导出为编码器/解码器两张ONNX图"""
+    import torch
+    from .torch_backend import DecoderModule, EncoderModule, load_network
+
+    net = load_network(config, torch.device("cpu"))
+    img = torch.zeros([1, 6, 160, 160])
+    audio = torch.zeros((1,) + AUDIO_SHAPES[config.asr])
+    with torch.no_grad():
+        skips = net.encode(img)
+        torch.onnx.export(EncoderModule(net), (img,), encoder_path, input_names=["input"], output_names=SKIP_NAMES,
+                          dynamic_axes={name: {0: "batch"} for name in ["input"] + SKIP_NAMES},
+                          opset_version=ONNX_OPSET, dynamo=False)
+        torch.onnx.export(DecoderModule(net), tuple(skips) + (audio,), decoder_path,
+                          input_names=SKIP_NAMES + ["audio"], output_names=["output"],
+                          dynamic_axes={name: {0: "batch"} for name in SKIP_NAMES + ["audio", "output"]},
+                          opset_version=ONNX_OPSET, dynamo=False)
+    print(f"已导出ONNX模型: {encoder_path}, {decoder_path}")
+
+
+class _ArrayReader:
+    """将校准批次转换为 onnxruntime.quantization 的 CalibrationDataReader 接口"""
+
+    def __init__(self, feeds):
+        self._feeds = iter(feeds)
+
+    def get_next(self):
+        return next(self._feeds, None)
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """ONNX Runtime CPU 推理后端"""
+
+    name = "onnx"
+    precisions = ("fp32", "int8-dynamic", "int8-static")
+    buffer_attrs = ("_images", "_buffers")
+
+    def __init__(self, config, calibration=None):
+        super().__init__(config)
+        os.makedirs(config.model_cache_dir, exist_ok=True)
+        # fp32图与后端、精度无关，量化图在其基础上生成
+        prefix = os.path.join(config.model_cache_dir, f"unet_{self.model_key}")
+        encoder_path, decoder_path = prefix + "_encoder.onnx", prefix + "_decoder.onnx"
+        if not (os.path.exists(encoder_path) and os.path.exists(decoder_path)):
+            export_onnx(config, encoder_path, decoder_path)
+        if self.precision != "fp32":
+            encoder_path, decoder_path = self._quantize(encoder_path, decoder_path, calibration)
+
+        self.encoder = self._create_session(encoder_path)
+        self.decoder = self._create_session(decoder_path)
+        self.skip_shapes = [tuple(i.shape[1:]) for i in self.decoder.get_inputs()[:len(SKIP_NAMES)]]
+        # 预分配的批次输入/输出缓冲区，通过IO binding零拷贝交给ORT
+        self._images = None
+        self._buffers = None
+        print(f"视频模型已加载: ONNX Runtime {ort.__version__} (CPUExecutionProvider, {self.precision})")
+
+    def _quantize(self, encoder_path: str, decoder_path: str, calibration):
+        """生成（或复用缓存的）int8量化图，返回量化后的编码器/解码器路径"""
+        from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+
+        suffix = f"_{self.precision}"
+        if self.precision == "int8-static":
+            # 静态量化的结果依赖校准数据，校准来源也纳入缓存键
+            source = f"{self.config.calibration_audio_path}:{self.config.calibration_frames}"
+            suffix += "_" + hashlib.sha1(source.encode("utf-8")).hexdigest()[:8]
+        quant_encoder = encoder_path.replace("_encoder.onnx", f"{suffix}_encoder.onnx")
+        quant_decoder = decoder_path.replace("_decoder.onnx", f"{suffix}_decoder.onnx")
+        if os.path.exists(quant_encoder) and os.path.exists(quant_decoder):
+            return quant_encoder, quant_decoder
+
+        # 量化前先做形状推断与图化简
+        prepared = []
+        for src in (encoder_path, decoder_path):
+            prepared_path = src.replace(".onnx", ".prep.onnx")
+            if not os.path.exists(prepared_path):
+                quant_pre_process(src, prepared_path, skip_symbolic_shape=True)
+            prepared.append(prepared_path)
+        encoder_path, decoder_path = prepared
+
+        if self.precision == "int8-dynamic":
+            # CPU上的ConvInteger只支持uint8权重
+            for src, dst in ((encoder_path, quant_encoder), (decoder_path, quant_decoder)):
+                quantize_dynamic(src, dst, weight_type=QuantType.QUInt8)
+        else:
+            if calibration is None:
+                raise ConfigurationError("int8-static 量化需要校准数据")
+            batches = list(calibration())
+            # 解码器的校准输入为fp32编码器的真实输出
+            encoder = ort.InferenceSession(encoder_path, providers=["CPUExecutionProvider"])
+            encoder_feeds, decoder_feeds = [], []
+            for patches, audio in batches:
+                images = preprocess_numpy(patches, np.empty((len(patches), 6, 160, 160), dtype=np.float32))
+                encoder_feeds.append({"input": images})
+                skips = encoder.run(SKIP_NAMES, {"input": images})
+                decoder_feeds.append(dict(zip(SKIP_NAMES + ["audio"], skips + [audio])))
+            for src, dst, feeds in ((encoder_path, quant_encoder, encoder_feeds),
+                                    (decoder_path, quant_decoder, decoder_feeds)):
+                quantize_static(src, dst, _ArrayReader(feeds), quant_format=QuantFormat.QDQ,
+                                activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                                per_channel=True)
+            print(f"int8静态量化校准完成: {sum(len(patches) for patches, _ in batches)} 帧")
+        print(f"已生成量化模型: {quant_encoder}, {quant_decoder}")
+        return quant_encoder, quant_decoder
+
+    def _session_options(self, level) -> ort.SessionOptions:
+        options = ort.SessionOptions()
+        options.graph_optimization_level = level
+        if self.config.onnx_num_threads > 0:
+            options.intra_op_num_threads = self.config.onnx_num_threads
+        return options
+
+    def _create_session(self, model_path: str) -> ort.InferenceSession:
+        """创建会话；首次运行时将图优化结果缓存到磁盘，之后直接加载"""
+        optimized_path = model_path[:-len(".onnx")] + ".opt.onnx"
+        if not os.path.exists(optimized_path):
+            # 只持久化与硬件无关的扩展级优化，布局相关优化在加载时重新进行
+            options = self._session_options(ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED)
+            options.optimized_model_filepath = optimized_path
+            ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        options = self._session_options(ort.GraphOptimizationLevel.ORT_ENABLE_ALL)
+        return ort.InferenceSession(optimized_path, options, providers=["CPUExecutionProvider"])
+
+    def encode(self, patches: np.ndarray) -> List[object]:
+        n = len(patches)
+        if self._images is None or self._images.shape[0] < n:
+            self._images = np.empty((n, 6, 160, 160), dtype=np.float32)
+        images = preprocess_numpy(patches, self._images[:n])
+        skips = self.encoder.run(SKIP_NAMES, {"input": images})
+        return [tuple(np.ascontiguousarray(t[k:k + 1]) for t in skips) for k in range(n)]
+
+    def _get_buffers(self, batch_size):
+        if self._buffers is None or self._buffers["audio"].shape[0] < batch_size:
+            self._buffers = {
+                "skips": [np.empty((batch_size,) + shape, dtype=np.float32) for shape in self.skip_shapes],
+                "audio": np.empty((batch_size,) + self.audio_shape, dtype=np.float32),
+                "output": np.empty((batch_size, 3, 160, 160), dtype=np.float32),
+                "scratch": np.empty((batch_size, 3, 160, 160), dtype=np.float32),
+                "output_u8": np.empty((batch_size, 160, 160, 3), dtype=np.uint8),
+            }
+        return self._buffers
+
+    def decode(self, frame_skips: List[object], audio: np.ndarray) -> np.ndarray:
+        n = len(frame_skips)
+        buffers = self._get_buffers(n)
+        inputs = []
+        for tensors, buf in zip(zip(*frame_skips), buffers["skips"]):
+            np.concatenate(tensors, axis=0, out=buf[:n])
+            inputs.append(buf[:n])
+        buffers["audio"][:n] = audio
+        inputs.append(buffers["audio"][:n])
+        output = buffers["output"][:n]
+
+        binding = self.decoder.io_binding()
+        for name, arr in zip(SKIP_NAMES + ["audio"], inputs):
+            binding.bind_input(name, "cpu", 0, np.float32, arr.shape, arr.ctypes.data)
+        binding.bind_output("output", "cpu", 0, np.float32, output.shape, output.ctypes.data)
+        self.decoder.run_with_iobinding(binding)
+        return postprocess_numpy(output, buffers["scratch"][:n], buffers["output_u8"][:n])
+
+    def skips_nbytes(self, skips) -> int:
+        return sum(t.nbytes for t in skips)
+
+    def skips_to_numpy(self, skips) -> List[np.ndarray]:
+        return list(skips)
+
+    def skips_from_numpy(self, arrays: List[np.ndarray]):
+        return tuple(np.ascontiguousarray(a, dtype=np.float32) for a in arrays)
@@ -0,0 +1,235 @@
+"""
+Digital Human SDK - PyTorch Inference Backend
+"""
+import copy
+import os
+from typing import List
+
+import numpy as np
+import torch
+
+from . import AUDIO_SHAPES, FACE_PATCH_SIZE, INNER, MASK_COLS, MASK_ROWS, InferenceBackend
+from ..unet import Model, fuse_conv_bn, check_fused_parity, load_checkpoint
+from ...exceptions import ConfigurationError
+
+# BN折叠前后输出（sigmoid后，0~1）允许的最大误差
+FUSE_BN_TOLERANCE = 1e-3
+
+
+def resolve_device(name: str) -> torch.device:
+    """解析推理设备配置：auto / cpu / cuda[:N]"""
+    if name == "auto":
+        name = "cuda" if torch.cuda.is_available() else "cpu"
+    device = torch.device(name)
+    if device.type == "cuda" and not torch.cuda.is_available():
+        raise ConfigurationError(f"配置的推理设备 {name} 不可用：未检测到CUDA")
+    if device.type not in ("cpu", "cuda"):
+        raise ConfigurationError(f"不支持的推理设备: {name}")
+    return device
+
+
+def load_network(config, device: torch.device) -> Model:
+    """加载权重并按配置折叠BN，返回eval模式的网络"""
+    state_dict, width, fused_bn = load_checkpoint(str(config.checkpoint), map_location=device,
+                                                  mmap=config.checkpoint_mmap)
+    if config.model_width != "auto" and config.model_width != width:
+        raise ConfigurationError(f"权重为 {width} 宽度网络，与配置的 model_width={config.model_width} 不一致")
+    if fused_bn:
+        # 转换后的权重已折叠BN（转换时已校验一致性）：在meta设备上构建同结构网络，
+        # 参数直接引用读入（内存映射）的张量，不分配、不复制权重
+        with torch.device("meta"):
+            net = fuse_conv_bn(Model(6, config.asr, width).eval())
+        net.load_state_dict(state_dict, assign=True)
+        print(f"网络宽度: {width}，已加载折叠BN的权重")
+        return net
+    net = Model(6, config.asr, width).to(device)
+    net.load_state_dict(state_dict)
+    net.eval()
+    print(f"网络宽度: {width}")
+    if config.fuse_bn:
+        reference = copy.deepcopy(net)
+        fuse_conv_bn(net)
+        max_error = check_fused_parity(reference, net, AUDIO_SHAPES[config.asr], device)
+        if max_error > FUSE_BN_TOLERANCE:
+            print(f"警告: BN折叠后输出误差 {max_error:.2e} 超过阈值，使用未折叠模型")
+            net = reference
+        else:
+            print(f"BN已折叠进卷积，最大输出误差 {max_error:.2e}")
+    return net
+
+
+class EncoderModule(torch.nn.Module):
+    """只包含编码器的包装模块，用于导出/追踪"""
+
+    def __init__(self, net: Model):
+        super().__init__()
+        self.net = net
+
+    def forward(self, x):
+        return self.net.encode(x)
+
+
+class DecoderModule(torch.nn.Module):
+    """音频分支+解码器的包装模块，跳连特征按位置参数传入"""
+
+    def __init__(self, net: Model):
+        super().__init__()
+        self.net = net
+
+    def forward(self, x1, x2, x3, x4, x5, audio):
+        return self.net.decode((x1, x2, x3, x4, x5), audio)
+
+
+class TorchBackend(InferenceBackend):
+    """PyTorch eager 推理后端"""
+
+    name = "torch"
+    precisions = ("fp32", "bf16")
+    buffer_attrs = ("_inputs", "_buffers")
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.device = resolve_device(config.device)
+        if self.device.type == "cpu" and config.torch_num_threads > 0:
+            torch.set_num_threads(config.torch_num_threads)
+        self.net = load_network(config, self.device)
+        # bf16：权重与激活均为bfloat16，输出再转回float32
+        self.dtype = torch.bfloat16 if self.precision == "bf16" else torch.float32
+        self.net.to(self.dtype)
+        # CPU上使用channels_last布局，深度可分离卷积的访存更友好
+        self.memory_format = torch.channels_last if self.device.type == "cpu" else torch.contiguous_format
+        self.net.to(memory_format=self.memory_format)
+        self._encode, self._decode = self.net.encode, self.net.decode
+        if config.torch_compile == "trace":
+            self._load_traced()
+        elif config.torch_compile == "compile":
+            self._compile()
+        # 预分配的批次输入/输出缓冲区，容量不足时才重新分配
+        self._inputs = None
+        self._buffers = None
+        print(f"视频模型已加载到设备: {self.device}")
+
+    def _artifact_prefix(self) -> str:
+        """编译产物路径前缀：权重内容 + 模式 + torch版本 + 设备"""
+        version = torch.__version__.replace("+", "_")
+        return os.path.join(self.config.model_cache_dir,
+                            f"unet_{self.cache_key}_torch{version}_{self.device.type}")
+
+    def _load_traced(self):
+        """加载缓存的TorchScript模型，不存在时追踪并冻结后写入缓存"""
+        os.makedirs(self.config.model_cache_dir, exist_ok=True)
+        prefix = self._artifact_prefix()
+        encoder_path, decoder_path = prefix + "_encoder.ts", prefix + "_decoder.ts"
+        if os.path.exists(encoder_path) and os.path.exists(decoder_path):
+            encoder = torch.jit.load(encoder_path, map_location=self.device)
+            decoder = torch.jit.load(decoder_path, map_location=self.device)
+            print(f"已加载TorchScript模型: {encoder_path}, {decoder_path}")
+        else:
+            img = torch.zeros([1, 6, 160, 160], device=self.device, dtype=self.dtype)
+            img = img.to(memory_format=self.memory_format)
+            audio = torch.zeros((1,) + self.audio_shape, device=self.device, dtype=self.dtype)
+            with torch.inference_mode():
+                skips = self.net.encode(img)
+            # 追踪时不能处于inference_mode，否则得到的是推理张量常量
+            with torch.no_grad():
+                encoder = torch.jit.freeze(torch.jit.trace(EncoderModule(self.net).eval(), (img,)))
+                decoder = torch.jit.freeze(torch.jit.trace(DecoderModule(self.net).eval(),
+                                                           tuple(t.clone() for t in skips) + (audio,)))
+            for module, path in ((encoder, encoder_path), (decoder, decoder_path)):
+                tmp_path = path + ".tmp"
+                torch.jit.save(module, tmp_path)
+                os.replace(tmp_path, path)
+            print(f"已追踪并缓存TorchScript模型: {encoder_path}, {decoder_path}")
+        self._encode = encoder
+        self._decode = lambda skips, audio: decoder(*skips, audio)
+
+    def _compile(self):
+        """torch.compile 编译编码器与解码器，Inductor缓存放在模型缓存目录下以便重启复用"""
+        cache_dir = os.path.join(self.config.model_cache_dir, "inductor")
+        os.makedirs(cache_dir, exist_ok=True)
+        os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", cache_dir)
+        self._encode = torch.compile(self.net.encode)
+        self._decode = torch.compile(self.net.decode)
+        print(f"已启用 torch.compile，编译缓存目录: {os.environ['TORCHINDUCTOR_CACHE_DIR']}")
+
+    def _host_and_device(self, shape, dtype):
+        """主机端numpy缓冲区及对应的设备张量（CPU上二者共享内存）"""
+        host = np.empty(shape, dtype=dtype)
+        host_tensor = torch.from_numpy(host)
+        device_tensor = host_tensor if self.device.type == "cpu" else torch.empty_like(host_tensor, device=self.device)
+        return host, device_tensor
+
+    def _get_input_buffers(self, batch_size):
+        """编码器输入缓冲区：uint8人脸图与float32网络输入"""
+        if self._inputs is None or self._inputs["patches"].shape[0] < batch_size:
+            patches_host, patches = self._host_and_device(
+                (batch_size, FACE_PATCH_SIZE, FACE_PATCH_SIZE, 3), np.uint8)
+            self._inputs = {
+                "patches_host": patches_host,
+                "patches": patches,
+                "images": torch.empty((batch_size, 6, 160, 160), device=self.device)
+                .to(memory_format=self.memory_format),
+            }
+        return self._inputs
+
+    def encode(self, patches: np.ndarray) -> List[object]:
+        n = len(patches)
+        buffers = self._get_input_buffers(n)
+        with torch.inference_mode():
+            # 只有uint8数据跨设备传输，归一化与遮挡在设备上进行
+            buffers["patches_host"][:n] = patches
+            x_u8 = buffers["patches"][:n]
+            if x_u8.data_ptr() != buffers["patches_host"].ctypes.data:
+                x_u8.copy_(torch.from_numpy(buffers["patches_host"][:n]), non_blocking=True)
+            x = buffers["images"][:n]
+            real, masked = x[:, :3], x[:, 3:]
+            real.copy_(x_u8[:, INNER, INNER].permute(0, 3, 1, 2))
+            real.div_(255.0)
+            masked.copy_(real)
+            masked[:, :, MASK_ROWS, MASK_COLS] = 0
+            skips = self._encode(x.to(self.dtype))
+            # 拷贝出单帧特征，避免缓存项引用整个批次的存储
+            return [tuple(t[k:k + 1].clone() for t in skips) for k in range(n)]
+
+    def _get_buffers(self, skips, batch_size):
+        if self._buffers is None or self._buffers["audio"].shape[0] < batch_size:
+            audio_host, audio = self._host_and_device((batch_size,) + self.audio_shape, np.float32)
+            output_host, output = self._host_and_device((batch_size, 160, 160, 3), np.uint8)
+            self._buffers = {
+                "skips": [torch.empty((batch_size,) + tuple(t.shape[1:]), dtype=t.dtype, device=self.device)
+                          .to(memory_format=self.memory_format) for t in skips],
+                "audio_host": audio_host,
+                "audio": audio,
+                "output_host": output_host,
+                "output": output,
+            }
+        return self._buffers
+
+    def decode(self, frame_skips: List[object], audio: np.ndarray) -> np.ndarray:
+        n = len(frame_skips)
+        buffers = self._get_buffers(frame_skips[0], n)
+        with torch.inference_mode():
+            skips = [torch.cat(tensors, dim=0, out=buf[:n])
+                     for tensors, buf in zip(zip(*frame_skips), buffers["skips"])]
+            # 音频窗口可能是只读的步长视图，先复制到主机缓冲区
+            buffers["audio_host"][:n] = audio
+            audio_feat = buffers["audio"][:n]
+            if audio_feat.data_ptr() != buffers["audio_host"].ctypes.data:
+                audio_feat.copy_(torch.from_numpy(buffers["audio_host"][:n]))
+            preds = self._decode(skips, audio_feat.to(self.dtype))
+            # 在设备上转为uint8 NHWC（截断取整，与原实现一致），只回传四分之一的字节
+            output = buffers["output"][:n]
+            output.copy_((preds.float() * 255).permute(0, 2, 3, 1))
+            if output.data_ptr() != buffers["output_host"].ctypes.data:
+                torch.from_numpy(buffers["output_host"][:n]).copy_(output)
+        return buffers["output_host"][:n]
+
+    def skips_nbytes(self, skips) -> int:
+        return sum(t.numel() * t.element_size() for t in skips)
+
+    def skips_to_numpy(self, skips) -> List[np.ndarray]:
+        return [t.float().cpu().numpy() for t in skips]
+
+    def skips_from_numpy(self, arrays: List[np.ndarray]):
+        return tuple(torch.from_numpy(a).to(self.device, dtype=self.dtype, memory_format=self.memory_format)
+                     for a in arrays)
@@ -0,0 +1,197 @@
+"""
+Digital Human SDK - Frame Compositor
+
+负责输出帧的尺寸与像素格式：底图按目标尺寸缩放并转换格式后缓存（每帧只做一次），
+重新合成的人脸区域在输出坐标系中转换格式后贴回，使用方拿到的帧可直接显示或编码。
+
+ROI输出模式下，帧只携带底图索引、人脸区域和区域图像（均为输出尺寸与格式）；
+需要完整画面的使用方（显示、编码等）用此类贴回底图。
+"""
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .frame_cache import LRUByteCache
+from ..exceptions import ConfigurationError
+
+PIXEL_FORMATS = ("bgr", "rgb", "rgba", "i420", "nv12")
+PLANAR_FORMATS = ("i420", "nv12")
+
+
+def resolve_output_size(source_size: Tuple[int, int], output_size: Optional[Tuple[int, int]],
+                        pixel_format: str = "bgr") -> Tuple[int, int]:
+    """解析目标输出尺寸 (width, height)；某一边为0时按底图宽高比推算"""
+    src_w, src_h = source_size
+    if not output_size:
+        width, height = src_w, src_h
+    else:
+        width, height = output_size
+        if width <= 0 and height <= 0:
+            width, height = src_w, src_h
+        elif width <= 0:
+            width = round(src_w * height / src_h)
+            if pixel_format in PLANAR_FORMATS:
+                # 推算出的边向下取偶数，显式指定的边保持不变
+                width -= width % 2
+        elif height <= 0:
+            height = round(src_h * width / src_w)
+            if pixel_format in PLANAR_FORMATS:
+                height -= height % 2
+    if pixel_format in PLANAR_FORMATS and (width % 2 or height % 2):
+        raise ConfigurationError(f"{pixel_format} 输出要求宽高为偶数，当前为 {width}x{height}")
+    return width, height
+
+
+def frame_shape(width: int, height: int, pixel_format: str) -> Tuple[int, ...]:
+    """指定格式整帧缓冲区的形状"""
+    if pixel_format in PLANAR_FORMATS:
+        return (height * 3 // 2, width)
+    return (height, width, 4 if pixel_format == "rgba" else 3)
+
+
+def convert_bgr(image: np.ndarray, pixel_format: str) -> np.ndarray:
+    """BGR图像转换为目标像素格式（平面格式要求宽高为偶数）"""
+    if pixel_format == "bgr":
+        return image
+    if pixel_format == "rgb":
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    if pixel_format == "rgba":
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGBA)
+    i420 = cv2.cvtColor(image, cv2.COLOR_BGR2YUV_I420)
+    if pixel_format == "i420":
+        return i420
+    # NV12：Y平面 + U/V交织的半分辨率平面
+    h, w = image.shape[:2]
+    u, v = _yuv_planes(i420, h, w, "i420")[1:]
+    nv12 = np.empty_like(i420)
+    nv12[:h] = i420[:h]
+    uv = nv12[h:].reshape(h // 2, w)
+    uv[:, 0::2] = u
+    uv[:, 1::2] = v
+    return nv12
+
+
+def _yuv_planes(buf: np.ndarray, h: int, w: int, pixel_format: str) -> List[np.ndarray]:
+    """平面格式缓冲区的各平面视图：i420 为 [Y, U, V]，nv12 为 [Y, UV]"""
+    flat = buf.reshape(-1)
+    y = flat[:h * w].reshape(h, w)
+    if pixel_format == "nv12":
+        return [y, flat[h * w:h * w * 3 // 2].reshape(h // 2, w)]
+    quarter = h * w // 4
+    return [y,
+            flat[h * w:h * w + quarter].reshape(h // 2, w // 2),
+            flat[h * w + quarter:h * w + 2 * quarter].reshape(h // 2, w // 2)]
+
+
+class FrameCompositor:
+    """按目标尺寸和像素格式生成输出帧"""
+
+    def __init__(self, get_frame: Callable[[int], np.ndarray], source_size: Tuple[int, int],
+                 output_size: Optional[Tuple[int, int]] = None, pixel_format: str = "bgr",
+                 cache_bytes: int = 0):
+        """
+        :param get_frame: 按底图索引返回原始BGR底图的函数（如 VideoModel.get_frame），返回值不会被修改
+        :param source_size: 底图尺寸 (width, height)
+        :param output_size: 输出尺寸 (width, height)，为空时与底图一致，某一边为0时按宽高比推算
+        :param pixel_format: 输出像素格式 bgr / rgb / rgba / i420 / nv12
+        :param cache_bytes: 缩放并转换后的底图缓存上限（字节）
+        """
+        if pixel_format not in PIXEL_FORMATS:
+            raise ConfigurationError(f"不支持的输出像素格式: {pixel_format}")
+        self.get_frame = get_frame
+        self.source_size = tuple(source_size)
+        self.pixel_format = pixel_format
+        self.width, self.height = resolve_output_size(self.source_size, output_size, pixel_format)
+        self.scale_x = self.width / self.source_size[0]
+        self.scale_y = self.height / self.source_size[1]
+        self.frame_shape = frame_shape(self.width, self.height, pixel_format)
+        # 输出与底图尺寸、格式相同时直接使用底图，无需额外缓存
+        self.passthrough = pixel_format == "bgr" and (self.width, self.height) == self.source_size
+        self._bases = LRUByteCache(cache_bytes, sizeof=lambda entry: entry[0].nbytes + entry[1].nbytes)
+
+    def _base(self, base_index: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(输出尺寸的BGR底图, 输出格式的底图)，首次使用时缩放、转换并缓存"""
+        if self.passthrough:
+            frame = self.get_frame(base_index)
+            return frame, frame
+        entry = self._bases.get(base_index)
+        if entry is None:
+            frame = self.get_frame(base_index)
+            if (self.width, self.height) != self.source_size:
+                frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+            converted = convert_bgr(frame, self.pixel_format)
+            for array in (frame, converted):
+                array.setflags(write=False)
+            entry = (frame, converted)
+            self._bases.put(base_index, entry)
+        return entry
+
+    @property
+    def cache_nbytes(self) -> int:
+        """缩放并转换后的底图缓存占用的字节数"""
+        return self._bases.nbytes
+
+    def clear_cache(self):
+        self._bases.clear()
+
+    def base_frame(self, base_index: int) -> np.ndarray:
+        """输出尺寸与格式的底图（只读），用于IDLE等无需合成的帧"""
+        return self._base(base_index)[1]
+
+    def scale_rect(self, rect: Tuple[int, int, int, int]) -> Tuple[int, int, int, int]:
+        """底图坐标的人脸区域 -> 输出坐标"""
+        if (self.width, self.height) == self.source_size:
+            return tuple(int(v) for v in rect)
+        xmin, ymin, xmax, ymax = rect
+        return (round(xmin * self.scale_x), round(ymin * self.scale_y),
+                round(xmax * self.scale_x), round(ymax * self.scale_y))
+
+    def make_patch(self, base_index: int, rect: Tuple[int, int, int, int],
+                   face: np.ndarray) -> Tuple[Tuple[int, int, int, int], np.ndarray]:
+        """将输出坐标下的BGR人脸图转换为输出格式的区域图像
+
+        平面格式（i420/nv12）的色度为半分辨率，区域会向外扩展到偶数边界，
+        扩展出的像素取自底图。返回 (区域, 区域图像)。
+        """
+        if self.pixel_format not in PLANAR_FORMATS:
+            return rect, convert_bgr(face, self.pixel_format)
+        xmin, ymin, xmax, ymax = rect
+        ax0, ay0 = xmin - xmin % 2, ymin - ymin % 2
+        ax1, ay1 = min(xmax + xmax % 2, self.width), min(ymax + ymax % 2, self.height)
+        region = self._base(base_index)[0][ay0:ay1, ax0:ax1].copy()
+        region[ymin - ay0:ymax - ay0, xmin - ax0:xmax - ax0] = face
+        return (ax0, ay0, ax1, ay1), convert_bgr(region, self.pixel_format)
+
+    def base_patch(self, base_index: int, rect: Tuple[int, int, int, int]
+                   ) -> Tuple[Tuple[int, int, int, int], np.ndarray]:
+        """底图自身在输出坐标区域内的图像（输出格式），用于原样输出底图的帧"""
+        xmin, ymin, xmax, ymax = rect
+        return self.make_patch(base_index, rect, self._base(base_index)[0][ymin:ymax, xmin:xmax])
+
+    def compose(self, base_index: int, rect: Tuple[int, int, int, int], patch: np.ndarray,
+                out: Optional[np.ndarray] = None) -> np.ndarray:
+        """合成完整帧；rect/patch 为 make_patch 的结果。提供 out 时写入 out 并返回，否则返回新数组"""
+        base = self._base(base_index)[1]
+        if out is None:
+            out = base.copy()
+        else:
+            np.copyto(out, base)
+        xmin, ymin, xmax, ymax = rect
+        if self.pixel_format not in PLANAR_FORMATS:
+            out[ymin:ymax, xmin:xmax] = patch
+            return out
+        dst = _yuv_planes(out, self.height, self.width, self.pixel_format)
+        src = _yuv_planes(patch, ymax - ymin, xmax - xmin, self.pixel_format)
+        dst[0][ymin:ymax, xmin:xmax] = src[0]
+        # 色度平面行数减半；i420 的U/V列数也减半，nv12 的UV交织后列数不变
+        col_div = 1 if self.pixel_format == "nv12" else 2
+        for d, s in zip(dst[1:], src[1:]):
+            d[ymin // 2:ymax // 2, xmin // col_div:xmax // col_div] = s
+        return out
+
+    def compose_frame(self, frame_data, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """FrameData -> 完整帧图像；非ROI帧直接返回其 image"""
+        if frame_data.patch is None:
+            return frame_data.image
+        return self.compose(frame_data.base_index, frame_data.rect, frame_data.patch, out)
@@ -0,0 +1,160 @@
+"""
+Digital Human SDK - Decoded Frame Cache
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+
+class LRUByteCache:
+    """按字节预算淘汰的LRU缓存（线程安全）"""
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[object], int] = None):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: value.nbytes)
+        self._items: "OrderedDict[object, object]" = OrderedDict()
+        self._sizes: Dict[object, int] = {}
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def nbytes(self) -> int:
+        """当前占用的字节数"""
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def get(self, key):
+        """获取缓存项，未命中返回None"""
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> bool:
+        """写入缓存项，超出预算的单项不缓存"""
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._items:
+                self._nbytes -= self._sizes[key]
+            self._items[key] = value
+            self._items.move_to_end(key)
+            self._sizes[key] = size
+            self._nbytes += size
+            while self._nbytes > self.max_bytes:
+                old_key, _ = self._items.popitem(last=False)
+                self._nbytes -= self._sizes.pop(old_key)
+        return True
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self._nbytes = 0
+
+
+class FrameCache:
+    """解码后的数字人底图缓存
+
+    缓存中的数组均为只读，合成时通过 get_writable() 取得副本（写时复制），
+    避免在逐帧热路径上重复进行JPEG解码。数据集无法完整放入缓存时，
+    每次访问会在后台顺序预取后续若干帧。
+    """
+
+    def __init__(self, loader: Callable[[int], Optional[np.ndarray]], frame_count: int,
+                 max_bytes: int, prefetch: int = 0):
+        self.loader = loader
+        self.frame_count = frame_count
+        self.prefetch = prefetch
+        self._cache = LRUByteCache(max_bytes)
+        self._pending: Dict[int, object] = {}
+        self._pending_lock = threading.Lock()
+        self._prefetcher: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def nbytes(self) -> int:
+        return self._cache.nbytes
+
+    @property
+    def max_bytes(self) -> int:
+        return self._cache.max_bytes
+
+    def fits(self, frame_bytes: int) -> bool:
+        """按单帧大小估计整个数据集能否放入缓存"""
+        return frame_bytes * self.frame_count <= self._cache.max_bytes
+
+    def _load(self, idx: int) -> Optional[np.ndarray]:
+        img = self.loader(idx)
+        if img is not None:
+            img.setflags(write=False)
+            self._cache.put(idx, img)
+        return img
+
+    def preload(self, workers: int = 4):
+        """启动时并行解码全部帧"""
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(pool.map(self._load, range(self.frame_count)))
+
+    def enable_prefetch(self):
+        """开启后台顺序预取（用于无法整体缓存的数据集）"""
+        if self.prefetch > 0 and self._prefetcher is None:
+            self._prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="frame-prefetch")
+
+    def _schedule_prefetch(self, idx: int):
+        for offset in range(1, self.prefetch + 1):
+            nxt = (idx + offset) % self.frame_count
+            if nxt in self._cache:
+                continue
+            with self._pending_lock:
+                if nxt in self._pending:
+                    continue
+                future = self._prefetcher.submit(self._load, nxt)
+                self._pending[nxt] = future
+            future.add_done_callback(lambda _f, key=nxt: self._finish_pending(key))
+
+    def _finish_pending(self, key: int):
+        with self._pending_lock:
+            self._pending.pop(key, None)
+
+    def get(self, idx: int) -> Optional[np.ndarray]:
+        """获取只读帧"""
+        img = self._cache.get(idx)
+        if img is None:
+            with self._pending_lock:
+                future = self._pending.get(idx)
+            img = future.result() if future is not None else self._load(idx)
+        if self._prefetcher is not None:
+            self._schedule_prefetch(idx)
+        return img
+
+    def get_writable(self, idx: int) -> Optional[np.ndarray]:
+        """获取可写副本，用于贴回合成结果"""
+        img = self.get(idx)
+        return None if img is None else img.copy()
+
+    def clear(self):
+        """清空已解码的帧"""
+        self._cache.clear()
+
+    def close(self):
+        """停止预取线程"""
+        if self._prefetcher is not None:
+            self._prefetcher.shutdown(wait=False)
+            self._prefetcher = None
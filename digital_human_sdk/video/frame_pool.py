@@ -0,0 +1,87 @@
+"""
+Digital Human SDK - Pooled Frame Buffers
+
+合成整帧时写入预分配的缓冲区，使用方释放后缓冲区回到池中复用，
+稳态渲染不再为每帧分配整幅图像。
+"""
+import queue
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class PooledFrame:
+    """池化帧缓冲区的句柄（引用计数）
+
+    获取时引用计数为1；需要在回调之外继续持有时调用 retain()，
+    每次 retain() 都要对应一次 release()，计数归零后缓冲区回到池中。
+    """
+    __slots__ = ("array", "_pool", "_refs", "_lock")
+
+    def __init__(self, array: np.ndarray, pool: Optional["FrameBufferPool"]):
+        self.array = array
+        self._pool = pool
+        self._refs = 1
+        self._lock = threading.Lock()
+
+    def retain(self) -> "PooledFrame":
+        with self._lock:
+            if self._refs <= 0:
+                raise RuntimeError("帧缓冲区已释放")
+            self._refs += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            if self._refs <= 0:
+                return
+            self._refs -= 1
+            if self._refs > 0:
+                return
+        if self._pool is not None:
+            self._pool._put_back(self.array)
+        self.array = None
+
+    def __enter__(self):
+        return self.array
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class FrameBufferPool:
+    """固定数量、固定尺寸的帧缓冲池（线程安全）
+
+    池空时 acquire() 等待使用方释放，形成对渲染线程的反压；
+    等待超时（使用方停滞或句柄丢失未释放）时临时分配新缓冲区，
+    它在释放时会补回池中，因此池容量可自行恢复。
+    """
+
+    def __init__(self, shape: Tuple[int, ...], count: int, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.capacity = count
+        self._free: "queue.LifoQueue[np.ndarray]" = queue.LifoQueue()
+        for _ in range(count):
+            self._free.put(np.empty(self.shape, dtype=dtype))
+        self.overflow = 0
+
+    @property
+    def available(self) -> int:
+        return self._free.qsize()
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledFrame:
+        """取出一个缓冲区，内容未初始化"""
+        try:
+            array = self._free.get(timeout=timeout)
+        except queue.Empty:
+            self.overflow += 1
+            if self.overflow == 1:
+                print(f"帧缓冲池耗尽（容量 {self.capacity}），临时分配新缓冲区")
+            array = np.empty(self.shape, dtype=self.dtype)
+        return PooledFrame(array, self)
+
+    def _put_back(self, array: np.ndarray):
+        if self._free.qsize() < self.capacity:
+            self._free.put(array)
@@ -0,0 +1,94 @@
+"""
+Digital Human SDK - Landmark Index
+"""
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def parse_lms(path: str) -> np.ndarray:
+    """解析单个.lms文件，返回 (P, 2) int32 关键点"""
+    lms_list = []
+    with open(path, "r") as f:
+        lines = f.read().splitlines()
+        for line in lines:
+            arr = line.split(" ")
+            arr = np.array(arr, dtype=np.float32)
+            lms_list.append(arr)
+    return np.array(lms_list, dtype=np.int32)
+
+
+def crop_box(lms: np.ndarray) -> Tuple[int, int, int, int]:
+    """由关键点计算人脸裁剪框 (xmin, ymin, xmax, ymax)"""
+    xmin = lms[1][0]
+    ymin = lms[52][1]
+    xmax = lms[31][0]
+    width = xmax - xmin
+    ymax = ymin + width
+    return xmin, ymin, xmax, ymax
+
+
+class LandmarkIndex:
+    """全部帧的关键点与裁剪框索引
+
+    所有数据保存在一个 (N, 4 + 2P) 的 int32 数组中：前4列为裁剪框，
+    其余为关键点坐标。索引一次性构建，并以数据集mtime为键缓存到 .npz 旁路文件，
+    逐帧开销只剩一次数组查找。
+    """
+
+    SIDECAR_NAME = "landmarks_index.npz"
+
+    def __init__(self, table: np.ndarray):
+        self.table = table
+        self.boxes = table[:, :4]
+        self.landmarks = table[:, 4:].reshape(len(table), -1, 2)
+
+    def __len__(self):
+        return len(self.table)
+
+    def box(self, idx: int) -> Tuple[int, int, int, int]:
+        """获取第idx帧的裁剪框"""
+        xmin, ymin, xmax, ymax = self.boxes[idx].tolist()
+        return xmin, ymin, xmax, ymax
+
+    @staticmethod
+    def dataset_key(lms_dir: str, frame_count: int) -> np.ndarray:
+        """以帧数和关键点文件的最新mtime作为缓存键"""
+        mtime = max(os.stat(os.path.join(lms_dir, f"{i}.lms")).st_mtime_ns for i in range(frame_count))
+        return np.array([frame_count, mtime], dtype=np.int64)
+
+    @classmethod
+    def build(cls, lms_dir: str, frame_count: int) -> "LandmarkIndex":
+        """解析全部.lms文件构建索引"""
+        rows = []
+        for i in range(frame_count):
+            lms = parse_lms(os.path.join(lms_dir, f"{i}.lms"))
+            rows.append(np.concatenate([np.array(crop_box(lms), dtype=np.int32), lms.reshape(-1)]))
+        return cls(np.stack(rows))
+
+    @classmethod
+    def load_or_build(cls, lms_dir: str, frame_count: int,
+                      sidecar_path: Optional[str] = None) -> "LandmarkIndex":
+        """优先从旁路缓存加载，键不匹配时重新构建并写回"""
+        if sidecar_path is None:
+            return cls.build(lms_dir, frame_count)
+
+        key = cls.dataset_key(lms_dir, frame_count)
+        if os.path.exists(sidecar_path):
+            try:
+                with np.load(sidecar_path) as data:
+                    if np.array_equal(data["key"], key):
+                        return cls(data["table"])
+            except Exception as e:
+                print(f"关键点索引缓存读取失败，重新构建: {e}")
+
+        index = cls.build(lms_dir, frame_count)
+        try:
+            tmp_path = sidecar_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, key=key, table=index.table)
+            os.replace(tmp_path, sidecar_path)
+        except OSError as e:
+            print(f"关键点索引缓存写入失败: {e}")
+        return index
@@ -0,0 +1,54 @@
+"""
+Digital Human SDK - Output Quality Metrics
+
+用于衡量量化/低精度推理相对fp32输出的画质漂移。输入均为 uint8 图像（H, W, C）。
+"""
+from typing import Dict, Iterable, Tuple
+
+import cv2
+import numpy as np
+
+_SSIM_C1 = (0.01 * 255) ** 2
+_SSIM_C2 = (0.03 * 255) ** 2
+
+
+def psnr(reference: np.ndarray, candidate: np.ndarray) -> float:
+    """峰值信噪比（dB），完全相同时返回 inf"""
+    mse = np.mean((reference.astype(np.float64) - candidate.astype(np.float64)) ** 2)
+    if mse == 0:
+        return float("inf")
+    return float(10 * np.log10(255.0 ** 2 / mse))
+
+
+def ssim(reference: np.ndarray, candidate: np.ndarray) -> float:
+    """结构相似度，11x11高斯窗口（sigma=1.5），多通道取平均"""
+    x = reference.astype(np.float64)
+    y = candidate.astype(np.float64)
+
+    def blur(img):
+        return cv2.GaussianBlur(img, (11, 11), 1.5)
+
+    mu_x, mu_y = blur(x), blur(y)
+    sigma_x = blur(x * x) - mu_x ** 2
+    sigma_y = blur(y * y) - mu_y ** 2
+    sigma_xy = blur(x * y) - mu_x * mu_y
+    ssim_map = ((2 * mu_x * mu_y + _SSIM_C1) * (2 * sigma_xy + _SSIM_C2)) / \
+               ((mu_x ** 2 + mu_y ** 2 + _SSIM_C1) * (sigma_x + sigma_y + _SSIM_C2))
+    return float(ssim_map.mean())
+
+
+def drift_report(pairs: Iterable[Tuple[np.ndarray, np.ndarray]]) -> Dict[str, float]:
+    """汇总 (fp32输出, 候选输出) 图像对的PSNR/SSIM，返回均值与最差值"""
+    psnrs, ssims = [], []
+    for reference, candidate in pairs:
+        psnrs.append(psnr(reference, candidate))
+        ssims.append(ssim(reference, candidate))
+    if not psnrs:
+        return {}
+    return {
+        "frames": len(psnrs),
+        "psnr_mean": float(np.mean(psnrs)),
+        "psnr_min": float(np.min(psnrs)),
+        "ssim_mean": float(np.mean(ssims)),
+        "ssim_min": float(np.min(ssims)),
+    }
@@ -0,0 +1,111 @@
+"""
+Digital Human SDK - Parallel Render Workers
+
+一句话的各帧在创建渲染上下文之后相互独立。工作线程各使用一份推理后端副本
+（共享只读权重、独立批次缓冲区），并发渲染不同的帧段，结果按输入顺序重新拼接，
+单个会话的渲染吞吐随CPU核数增长。PyTorch/ONNX Runtime/OpenCV 的计算都会释放GIL，
+因此使用线程即可，不需要为每个进程复制一份权重。
+"""
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+
+def available_cpus():
+    """当前进程可用的CPU编号"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class RenderWorkerPool:
+    """并行渲染工作线程池
+
+    - 每个工作线程首次渲染时由 VideoModel 创建自己的后端副本（InferenceBackend.replicate()）；
+    - threads_per_worker 为每个工作线程内算子使用的线程数（torch intra-op / OpenCV），
+      0 表示按可用CPU数平均分配；算子线程数是进程级设置，只在 torch_num_threads /
+      opencv_num_threads 保持默认值（0）时应用，close() 时恢复原值；
+    - cpu_affinity 为 True 时把各工作线程（及其算子线程）绑定到互不重叠的CPU上（仅Linux）。
+    """
+
+    def __init__(self, model, workers: int, threads_per_worker: int = 0, cpu_affinity: bool = False):
+        self.model = model
+        self.workers = workers
+        cpus = available_cpus()
+        self.threads_per_worker = threads_per_worker if threads_per_worker > 0 else max(1, len(cpus) // workers)
+        self._cpu_sets = None
+        if cpu_affinity and hasattr(os, "sched_setaffinity"):
+            step = self.threads_per_worker
+            self._cpu_sets = [cpus[i * step:(i + 1) * step] or cpus for i in range(workers)]
+        # 算子线程数为进程级设置（OpenMP 为每个调用线程各建一组算子线程），不覆盖用户显式配置的值
+        self._restore = []
+        if model.config.opencv_num_threads == 0:
+            self._restore.append((cv2.setNumThreads, cv2.getNumThreads()))
+            cv2.setNumThreads(self.threads_per_worker)
+        if model.backend.name == "torch" and model.config.torch_num_threads == 0:
+            import torch
+            self._restore.append((torch.set_num_threads, torch.get_num_threads()))
+            torch.set_num_threads(self.threads_per_worker)
+        self._worker_ids = itertools.count()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render-worker",
+                                            initializer=self._init_worker)
+        print(f"并行渲染: {workers} 个工作线程，每线程 {self.threads_per_worker} 个算子线程"
+              f"{'，已绑定CPU' if self._cpu_sets else ''}")
+
+    def _init_worker(self):
+        worker_id = next(self._worker_ids)
+        if self._cpu_sets is not None:
+            os.sched_setaffinity(0, self._cpu_sets[worker_id % self.workers])
+
+    def _render_chunk(self, indices, frame_numbers, speaking, held, stride, interpolation, context):
+        return self.model._batch_patches(indices, frame_numbers, speaking, held, stride, interpolation,
+                                         self.model._thread_backend(), context)
+
+    def render(self, indices, frame_numbers, batch_size=None, roi=None, pooled=None, active=None, stride=None,
+               interpolation=None, hold=None, context=None):
+        """与 VideoModel.process_frames 参数相同：按批切分后并发渲染，按输入顺序产出帧
+
+        工作线程只渲染人脸区域，每批使用上下文的独立副本（RenderContext.fork()），互不共享逐帧状态；
+        重复上一帧与合成在消费方按输出顺序完成，重复帧总是与输出中的前一帧相同。
+        隔帧推理的关键帧不跨批复用，批边界处可能多推理一帧。
+        """
+        model = self.model
+        indices = list(indices)
+        frame_numbers = list(frame_numbers)
+        batch_size = batch_size or model.config.inference_batch_size
+        if roi is None:
+            roi = model.config.output_mode == "roi"
+        if pooled is None:
+            pooled = model.frame_pool is not None
+        stride = stride or model.config.inference_stride
+        interpolation = interpolation or model.config.frame_interpolation
+        context = context or model.context
+        backend = model._thread_backend()
+        pending = deque()
+
+        def emit(start, future):
+            return model._emit_frames(indices[start:start + batch_size], future.result(), roi, pooled, backend,
+                                      context)
+
+        # 最多领先消费方 2 * workers 批，限制未取走的帧占用的内存
+        for start in range(0, len(indices), batch_size):
+            end = start + batch_size
+            speaking = [True] * len(indices[start:end]) if active is None else list(active[start:end])
+            held = [False] * len(indices[start:end]) if hold is None else list(hold[start:end])
+            pending.append((start, self._executor.submit(self._render_chunk, indices[start:end],
+                                                         frame_numbers[start:end], speaking, held, stride,
+                                                         interpolation, context.fork())))
+            while len(pending) >= 2 * self.workers:
+                yield from emit(*pending.popleft())
+        while pending:
+            yield from emit(*pending.popleft())
+
+    def close(self):
+        """停止工作线程，恢复进程级的算子线程数"""
+        self._executor.shutdown(wait=True)
+        for set_threads, threads in self._restore:
+            set_threads(threads)
+        self._restore = []
@@ -1,8 +1,18 @@
+import os
 import time
 import math
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+# 各层通道宽度：slim 为移动端/高密度CPU部署的窄版本
+MODEL_WIDTHS = {
+    'base': [32, 64, 128, 256, 512],
+    'slim': [16, 32, 64, 128, 256],
+}
+# wenet 音频特征窗口的通道数，与网络宽度无关
+WENET_AUDIO_CHANNELS = 256
 
 class InvertedResidual(nn.Module):
     def __init__(self, inp, oup, stride, use_res_connect, expand_ratio=6):
@@ -94,11 +104,10 @@ class OutConv(nn.Module):
         return self.conv(x)
 
 class AudioConvWenet(nn.Module):
-    def __init__(self):
+    def __init__(self, ch=MODEL_WIDTHS['base']):
         super(AudioConvWenet, self).__init__()
-        # ch = [16, 32, 64, 128, 256]   # if you want to run this model on a mobile device, use this. 
-        ch = [32, 64, 128, 256, 512]
-        self.conv1 = InvertedResidual(ch[3], ch[3], stride=1, use_res_connect=True, expand_ratio=2)
+        self.conv1 = InvertedResidual(WENET_AUDIO_CHANNELS, ch[3], stride=1,
+                                      use_res_connect=ch[3] == WENET_AUDIO_CHANNELS, expand_ratio=2)
         self.conv2 = InvertedResidual(ch[3], ch[3], stride=1, use_res_connect=True, expand_ratio=2)
         
         self.conv3 = nn.Conv2d(ch[3], ch[3], kernel_size=3, padding=1, stride=(1,2))
@@ -130,10 +139,8 @@ class AudioConvWenet(nn.Module):
         return x
     
 class AudioConvHubert(nn.Module):
-    def __init__(self):
+    def __init__(self, ch=MODEL_WIDTHS['base']):
         super(AudioConvHubert, self).__init__()
-        # ch = [16, 32, 64, 128, 256]   # if you want to run this model on a mobile device, use this. 
-        ch = [32, 64, 128, 256, 512]
         self.conv1 = InvertedResidual(32, ch[1], stride=1, use_res_connect=False, expand_ratio=2)
         self.conv2 = InvertedResidual(ch[1], ch[2], stride=1, use_res_connect=False, expand_ratio=2)
         
@@ -166,16 +173,16 @@ class AudioConvHubert(nn.Module):
         return x
 
 class Model(nn.Module):
-    def __init__(self,n_channels=6, mode='hubert'):
+    def __init__(self,n_channels=6, mode='hubert', width='base'):
         super(Model, self).__init__()
         self.n_channels = n_channels   #BGR
-        # ch = [16, 32, 64, 128, 256]  # if you want to run this model on a mobile device, use this. 
-        ch = [32, 64, 128, 256, 512]
+        self.width = width
+        ch = MODEL_WIDTHS[width]
         
         if mode=='hubert':
-            self.audio_model = AudioConvHubert()
+            self.audio_model = AudioConvHubert(ch)
         if mode=='wenet':
-            self.audio_model = AudioConvWenet()
+            self.audio_model = AudioConvWenet(ch)
             
         self.fuse_conv = nn.Sequential(
             DoubleConvDW(ch[4]*2, ch[4], stride=1),
@@ -196,13 +203,20 @@ class Model(nn.Module):
         self.outc = OutConv(ch[0], 3)
 
     def forward(self, x, audio_feat):
+        return self.decode(self.encode(x), audio_feat)
 
+    def encode(self, x):
+        """图像编码器：只依赖6通道图像输入，返回跳连特征 (x1, x2, x3, x4, x5)"""
         x1 = self.inc(x)
         x2 = self.down1(x1)
         x3 = self.down2(x2)
         x4 = self.down3(x3)
         x5 = self.down4(x4)
-        
+        return x1, x2, x3, x4, x5
+
+    def decode(self, skips, audio_feat):
+        """音频分支 + 解码器：由跳连特征和音频特征生成输出图像"""
+        x1, x2, x3, x4, x5 = skips
         audio_feat  = self.audio_model(audio_feat)
         x5 = torch.cat([x5, audio_feat], axis=1)
         x5 = self.fuse_conv(x5)
@@ -214,28 +228,86 @@ class Model(nn.Module):
         out = F.sigmoid(out)
         return out
 
+def infer_width(state_dict) -> str:
+    """由权重形状推断网络宽度（outc 的输入通道即第一层宽度）"""
+    in_channels = state_dict['outc.conv.weight'].shape[1]
+    for width, ch in MODEL_WIDTHS.items():
+        if ch[0] == in_channels:
+            return width
+    raise ValueError(f"无法识别的网络宽度: outc 输入通道数 {in_channels}")
+
+def load_checkpoint(path, map_location=None, mmap=False):
+    """读取权重文件，返回 (state_dict, width, fused_bn)
+
+    兼容纯 state_dict 以及 {"state_dict": ..., "model_width": ..., "fused_bn": ...} 形式的带元数据文件；
+    没有元数据时由权重形状推断宽度。mmap=True 时张量直接映射文件（只在访问时读入），
+    多个进程映射同一文件时共享物理内存；不支持映射的旧序列化格式回退为完整读取。
+    """
+    try:
+        checkpoint = torch.load(path, map_location=map_location, mmap=mmap)
+    except RuntimeError as e:
+        if not mmap:
+            raise
+        print(f"警告: 权重文件无法内存映射（{e}），改为完整读取；可用 tools.convert_checkpoint 转换")
+        checkpoint = torch.load(path, map_location=map_location)
+    fused_bn = False
+    if 'state_dict' in checkpoint and isinstance(checkpoint['state_dict'], dict):
+        state_dict = checkpoint['state_dict']
+        width = checkpoint.get('model_width') or infer_width(state_dict)
+        fused_bn = bool(checkpoint.get('fused_bn', False))
+    else:
+        state_dict = checkpoint
+        width = infer_width(state_dict)
+    return state_dict, width, fused_bn
+
+def save_checkpoint(model: nn.Module, path):
+    """保存为带元数据、可内存映射加载的权重文件（先写临时文件再替换）
+
+    张量按当前内存布局保存（如 channels_last），加载后无需再转换布局。
+    """
+    fused_bn = not any(isinstance(m, nn.BatchNorm2d) for m in model.modules())
+    tmp_path = f"{path}.tmp"
+    torch.save({'state_dict': model.state_dict(), 'model_width': model.width, 'fused_bn': fused_bn}, tmp_path)
+    os.replace(tmp_path, path)
+    return fused_bn
+
+def fuse_conv_bn(model: nn.Module) -> nn.Module:
+    """推理时将BatchNorm折叠进前面的卷积（原地修改，要求eval模式）
+
+    覆盖 InvertedResidual 等 nn.Sequential 中相邻的 Conv2d→BatchNorm2d，
+    以及音频分支中独立的 conv3/bn3、conv5/bn5。被折叠的BN替换为 nn.Identity。
+    """
+    assert not model.training, "BN折叠只能用于eval模式的模型"
+    for module in list(model.modules()):
+        if isinstance(module, nn.Sequential):
+            for i in range(len(module) - 1):
+                conv, bn = module[i], module[i + 1]
+                if isinstance(conv, nn.Conv2d) and isinstance(bn, nn.BatchNorm2d):
+                    module[i] = fuse_conv_bn_eval(conv, bn)
+                    module[i + 1] = nn.Identity()
+        for name in ('3', '5'):
+            conv, bn = getattr(module, 'conv' + name, None), getattr(module, 'bn' + name, None)
+            if isinstance(conv, nn.Conv2d) and isinstance(bn, nn.BatchNorm2d):
+                setattr(module, 'conv' + name, fuse_conv_bn_eval(conv, bn))
+                setattr(module, 'bn' + name, nn.Identity())
+    return model
+
+def check_fused_parity(reference: nn.Module, fused: nn.Module, audio_shape, device='cpu', batch=2, seed=0) -> float:
+    """以随机输入比较折叠前后模型的输出，返回最大绝对误差"""
+    generator = torch.Generator().manual_seed(seed)
+    img = torch.rand((batch, reference.n_channels, 160, 160), generator=generator).to(device)
+    audio = torch.randn((batch,) + tuple(audio_shape), generator=generator).to(device)
+    with torch.inference_mode():
+        return (reference(img, audio) - fused(img, audio)).abs().max().item()
+
 if __name__ == '__main__':
     import time
-    import copy
     import onnx
     import numpy as np
     onnx_path = "./unet.onnx"
 
     from thop import profile, clever_format
 
-    def reparameterize_model(model: torch.nn.Module) -> torch.nn.Module:
-        """ Method returns a model where a multi-branched structure
-            used in training is re-parameterized into a single branch
-            for inference.
-        :param model: MobileOne model in train mode.
-        :return: MobileOne model in inference mode.
-        """
-        # Avoid editing original graph
-        model = copy.deepcopy(model)
-        for module in model.modules():
-            if hasattr(module, 'reparameterize'):
-                module.reparameterize()
-        return model
     device = torch.device("cuda")
     def check_onnx(torch_out, torch_in, audio):
         onnx_model = onnx.load(onnx_path)
@@ -252,7 +324,7 @@ if __name__ == '__main__':
     net = Model(6).eval().to(device)
     img = torch.zeros([1, 6, 160, 160]).to(device)
     audio = torch.zeros([1, 16, 32, 32]).to(device)
-    # net = reparameterize_model(net)
+    # net = fuse_conv_bn(net)
     flops, params = profile(net, (img,audio))
     macs, params = clever_format([flops, params], "%3f")
     print(macs, params)
@@ -1,32 +1,155 @@
+import copy
 import os
+import threading
+import time
+import hashlib
+import zipfile
+from dataclasses import replace
 import numpy as np
-import torch
 import cv2
-from .unet import Model
+from .frame_cache import FrameCache, LRUByteCache
+from .landmarks import LandmarkIndex
+from .avatar_bundle import AvatarBundle, crop_face
+from .backends import AUDIO_SHAPES, create_backend
+from .quality import drift_report
+from .compositor import FrameCompositor
+from .interpolation import interpolate_faces
+from .frame_pool import FrameBufferPool
+from .render_pool import RenderWorkerPool
 from ..config.config import Config
+from ..models import FramePatch
+
+
+# 每帧音频窗口覆盖的特征帧数：当前帧前后各8帧
+AUDIO_WINDOW = 16
+# 帧缓冲池耗尽时等待使用方释放的最长时间（秒），超时后临时分配
+FRAME_POOL_TIMEOUT = 2.0
+
+
+def audio_windows(audio_feats):
+    """整句特征两端补零后，返回所有帧音频窗口的步长视图 [T + 8, 16 * 单帧特征长度]
+
+    第i行即原实现中 feats[i-8:i+8]（越界部分补零）展平后的结果；
+    行之间共享内存，按连续帧号切片不产生拷贝。
+    """
+    audio_feats = np.ascontiguousarray(audio_feats, dtype=np.float32)
+    half = AUDIO_WINDOW // 2
+    frame_count, row = len(audio_feats), audio_feats[0].size
+    # 左补8帧，右补16帧：原实现对 T <= i < T+8 的帧号也返回部分补零的窗口
+    padded = np.zeros((frame_count + AUDIO_WINDOW + half, row), dtype=np.float32)
+    padded[half:half + frame_count] = audio_feats.reshape(frame_count, row)
+    windows = np.lib.stride_tricks.as_strided(
+        padded, shape=(frame_count + half, AUDIO_WINDOW * row), strides=(padded.strides[0], padded.strides[1]),
+        writeable=False)
+    return windows
+
+
+class FaceEncoding:
+    """单个形象帧的编码器跳连特征与人脸图"""
+    __slots__ = ("skips", "patch", "crop_size", "nbytes")
+
+    def __init__(self, skips, patch, crop_size, skips_nbytes):
+        self.skips = skips
+        self.patch = patch
+        self.crop_size = crop_size
+        self.nbytes = skips_nbytes + patch.nbytes
+
+
+class RenderContext:
+    """一句话的渲染上下文：音频特征窗口及跨批次的逐帧状态
+
+    由 VideoModel.create_context() 创建。句子相关的状态全部保存在上下文中，
+    VideoModel 的渲染接口不修改任何共享状态；多个会话、工作线程可以各用自己的上下文
+    并发调用同一个 VideoModel，共享权重与各级缓存。
+
+    上下文本身不是线程安全的：渲染时会更新跨批次状态（stride_cache、last_patch），
+    同一个上下文不能同时在多个线程中使用。需要并发渲染同一句话时，各线程使用 fork() 的副本
+    （RenderWorkerPool 即如此）。
+    """
+    __slots__ = ("model", "audio_feats", "audio_windows", "stride_cache", "last_patch")
+
+    def __init__(self, model, audio_features):
+        self.model = model
+        self.audio_feats = audio_features
+        self.audio_windows = audio_windows(audio_features)
+        # 隔帧推理时保留的上一个关键帧预测 {(帧号, 形象帧索引): pred}
+        self.stride_cache = {}
+        # 最近输出的人脸区域，跳过推理的帧重复该区域
+        self.last_patch = None
+
+    def audio_batch(self, frame_numbers):
+        """一批帧的音频窗口 [N, *AUDIO_SHAPES[mode]]；连续帧号直接返回视图，不分配内存"""
+        windows = self.audio_windows
+        first, last = frame_numbers[0], frame_numbers[-1]
+        if 0 <= first and last < len(windows) and list(frame_numbers) == list(range(first, last + 1)):
+            batch = windows[first:last + 1]
+        else:
+            batch = windows[np.clip(frame_numbers, 0, len(windows) - 1)]
+        return batch.reshape((len(frame_numbers),) + AUDIO_SHAPES[self.model.mode])
+
+    def render(self, indices, frame_numbers, **kwargs):
+        """渲染本句的帧，参数同 VideoModel.process_frames"""
+        return self.model.process_frames(indices, frame_numbers, context=self, **kwargs)
+
+    def fork(self):
+        """共享音频窗口、跨批次状态为空的副本，供并发渲染的各批次各自使用"""
+        forked = copy.copy(self)
+        forked.stride_cache = {}
+        forked.last_patch = None
+        return forked
+
 
 class VideoModel:
-    def __init__(self, config :Config):
+    """数字人视频模型
+
+    渲染接口（create_context / process_frames / RenderContext.render）是线程安全的：
+    每个调用线程使用自己的推理后端副本（共享权重），缓存均为线程安全的LRU；
+    并发调用时每个线程传入各自的渲染上下文。
+    set_audio_features 为兼容旧调用方式的单线程接口。
+    """
+
+    def __init__(self, config :Config, backend=None):
+        """
+        :param backend: 已加载的推理后端；多个形象共用同一份权重时传入，为空时按配置创建
+        """
         self.config = config
         self.checkpoint = str(config.checkpoint)
         self.dataset_dir = str(config.dataset)
         self.mode = config.asr
 
-        # 加载模型
-        self.net = Model(6, self.mode).cuda()
-        self.net.load_state_dict(torch.load(self.checkpoint))
-        self.net.eval()
+        # set_audio_features 设置的默认渲染上下文
+        self.context = None
+        # 每个渲染线程的推理后端副本
+        self._local = threading.local()
+        if config.opencv_num_threads > 0:
+            cv2.setNumThreads(config.opencv_num_threads)
+        # 加载数字人形象：优先使用单文件形象包，否则读取散装目录
+        self.bundle = None
+        if config.avatar_bundle_path:
+            self._init_bundle_avatar(config)
+        else:
+            self._init_directory_avatar(config)
 
-        # 需要处理的音频特征
-        self.audio_feats = None
-        # 设置视频路径和参数
-        self.img_dir = os.path.join(self.dataset_dir, "full_body_img/")
-        self.lms_dir = os.path.join(self.dataset_dir, "landmarks/")
-        self.len_img = len(os.listdir(self.img_dir)) - 1
-        print(f"data: {self.img_dir}, {self.lms_dir}")
-        # 获取示例图像尺寸
-        exm_img = self.load_image(os.path.join(self.img_dir, "0.jpg"))
-        self.h, self.w = exm_img.shape[:2]
+        # 加载模型：张量计算全部交给推理后端（静态量化时用形象帧校准）
+        self.backend = backend or create_backend(config, calibration=self._calibration_batches)
+        self.precision_drift = None
+        if backend is None and config.precision != "fp32" and config.precision_report:
+            self.precision_drift = self._report_precision_drift(config)
+
+        self._init_encoder_cache(config)
+        # 输出帧的尺寸与像素格式由合成器负责；完整输出模式下写入池化的帧缓冲区
+        self.compositor = FrameCompositor(self.get_frame, (self.w, self.h), config.output_size,
+                                          config.output_pixel_format, config.frame_cache_max_bytes)
+        # 静音帧的闭口渲染缓存（按形象帧）
+        self.silent_cache = LRUByteCache(config.silence_cache_max_bytes, sizeof=lambda frame_patch: frame_patch.patch.nbytes)
+        self.frame_pool = None
+        if config.frame_pool_size > 0:
+            self.frame_pool = FrameBufferPool(self.compositor.frame_shape, config.frame_pool_size)
+        # 多个工作线程并行渲染同一句话的不同帧段
+        self.render_pool = None
+        if config.render_workers > 1:
+            self.render_pool = RenderWorkerPool(self, config.render_workers, config.render_threads_per_worker,
+                                                config.render_cpu_affinity)
 
         # 计算总帧数和估计的视频时长（秒）
         self.total_frames = 0
@@ -34,82 +157,424 @@ class VideoModel:
         self.frame_interval = 1.0 / self.fps  # 每帧间隔（秒）
         self.video_duration = 0
     
+    def _init_directory_avatar(self, config: Config):
+        """从 full_body_img/ 与 landmarks/ 散装目录加载形象"""
+        self.img_dir = os.path.join(self.dataset_dir, "full_body_img/")
+        self.lms_dir = os.path.join(self.dataset_dir, "landmarks/")
+        self.len_img = len(os.listdir(self.img_dir)) - 1
+        print(f"data: {self.img_dir}, {self.lms_dir}")
+
+        # 关键点与裁剪框索引：一次性构建，逐帧只需数组查找
+        sidecar = os.path.join(self.dataset_dir, LandmarkIndex.SIDECAR_NAME) if config.landmark_index_cache else None
+        self.landmarks = LandmarkIndex.load_or_build(self.lms_dir, self.len_img, sidecar)
+
+        # 解码帧缓存：热路径上不再逐帧解码JPEG
+        self.frame_cache = FrameCache(
+            loader=lambda idx: self.load_image(os.path.join(self.img_dir, f"{idx}.jpg")),
+            frame_count=self.len_img,
+            max_bytes=config.frame_cache_max_bytes,
+            prefetch=config.frame_cache_prefetch,
+        )
+        # 获取示例图像尺寸
+        exm_img = self.frame_cache.get(0)
+        self.h, self.w = exm_img.shape[:2]
+        self._start_frame_cache(config, exm_img.nbytes)
+
+    def _init_bundle_avatar(self, config: Config):
+        """从单文件形象包加载形象，所有数据按需换页"""
+        self.bundle = AvatarBundle(config.avatar_bundle_path)
+        self.len_img = self.bundle.frame_count
+        self.h, self.w = self.bundle.height, self.bundle.width
+        self.landmarks = self.bundle.landmarks
+        print(f"data: {config.avatar_bundle_path}, {self.len_img} frames ({self.bundle.frame_format})")
+
+        # raw格式直接返回memmap视图，无需再缓存解码结果
+        raw = self.bundle.frame_format == "raw"
+        self.frame_cache = FrameCache(
+            loader=self.bundle.frame,
+            frame_count=self.len_img,
+            max_bytes=0 if raw else config.frame_cache_max_bytes,
+            prefetch=config.frame_cache_prefetch,
+        )
+        if not raw:
+            self._start_frame_cache(config, self.h * self.w * 3)
+
+    def _start_frame_cache(self, config: Config, frame_bytes: int):
+        """能完整放入缓存时预加载，否则开启顺序预取"""
+        if self.frame_cache.fits(frame_bytes):
+            if config.frame_cache_preload:
+                self.frame_cache.preload(config.frame_cache_preload_workers)
+        else:
+            print(f"数据集超出帧缓存上限 {config.frame_cache_max_bytes} 字节，启用顺序预取")
+            self.frame_cache.enable_prefetch()
+
+    @property
+    def cache_nbytes(self):
+        """本形象各级缓存（解码帧、编码器特征、输出底图、静音渲染）当前占用的字节数"""
+        return (self.frame_cache.nbytes + self.encoder_cache.nbytes + self.compositor.cache_nbytes
+                + self.silent_cache.nbytes)
+
+    def close(self):
+        """释放本形象的缓存与工作线程；推理后端可能与其他形象共用，不在此释放"""
+        self.frame_cache.close()
+        if self.render_pool is not None:
+            self.render_pool.close()
+        for cache in (self.frame_cache, self.encoder_cache, self.silent_cache):
+            cache.clear()
+        self.compositor.clear_cache()
+
+    def clone_with_backend(self, backend, config=None):
+        """共享形象数据（底图、关键点、合成器）、使用另一推理后端的副本，用于自动调优时对比后端
+
+        编码器特征与静音渲染缓存属于后端各自独立；副本不使用帧缓冲池和并行渲染，
+        也不应调用 close()（会释放与本模型共用的底图缓存）。
+        """
+        clone = copy.copy(self)
+        clone.config = config or self.config
+        clone.backend = backend
+        clone._local = threading.local()
+        clone.context = None
+        clone.frame_pool = None
+        clone.render_pool = None
+        clone.encoder_cache = LRUByteCache(clone.config.encoder_cache_max_bytes, sizeof=lambda entry: entry.nbytes)
+        clone.silent_cache = LRUByteCache(clone.config.silence_cache_max_bytes,
+                                          sizeof=lambda frame_patch: frame_patch.patch.nbytes)
+        return clone
+
+    def create_context(self, audio_features):
+        """为一句话创建渲染上下文，一次性补零并建立全部帧的音频窗口视图"""
+        return RenderContext(self, audio_features)
+
     def set_audio_features(self, audio_features):
-        self.audio_feats = audio_features
+        """设置默认渲染上下文（不传 context 的 process_frames 使用），非线程安全"""
+        self.context = self.create_context(audio_features)
+
+    @property
+    def audio_feats(self):
+        return self.context.audio_feats if self.context is not None else None
+
+    @property
+    def audio_windows(self):
+        return self.context.audio_windows if self.context is not None else None
+
+    def _thread_backend(self):
+        """当前线程的推理后端副本（共享权重、独立批次缓冲区），首次使用时创建"""
+        backend = getattr(self._local, "backend", None)
+        if backend is None:
+            backend = self._local.backend = self.backend.replicate()
+        return backend
 
     def load_image(self, path):
         """加载图像"""
         return cv2.imread(path)
 
-    def get_audio_features(self, index):
-        """获取音频特征"""
-        left = index - 8
-        right = index + 8
-        pad_left = 0
-        pad_right = 0
-        if left < 0:
-            pad_left = -left
-            left = 0
-        if right > self.audio_feats.shape[0]:
-            pad_right = right - self.audio_feats.shape[0]
-            right = self.audio_feats.shape[0]
-        auds = torch.from_numpy(self.audio_feats[left:right])
-        if pad_left > 0:
-            auds = torch.cat([torch.zeros_like(auds[:pad_left]), auds], dim=0)
-        if pad_right > 0:
-            auds = torch.cat([auds, torch.zeros_like(auds[:pad_right])], dim=0)
-        return auds
-
-    def process_frame(self, img_idx, current_frame):
+    def get_frame(self, img_idx):
+        """获取只读的数字人底图"""
+        return self.frame_cache.get(img_idx)
+
+    def get_output_frame(self, img_idx):
+        """获取输出尺寸与像素格式的只读底图（IDLE等无需合成的帧）"""
+        return self.compositor.base_frame(img_idx)
+
+    def get_audio_features(self, index, context=None):
+        """获取音频特征窗口 [16, *feature_shape]（只读视图）"""
+        context = context or self.context
+        index = min(max(index, 0), len(context.audio_windows) - 1)
+        return context.audio_windows[index].reshape((AUDIO_WINDOW,) + context.audio_feats.shape[1:])
+
+    def _calibration_batches(self):
+        """校准数据：均匀抽取的形象帧 + 录制会话音频特征窗口，按推理批大小分批"""
+        # 每帧特征长度由ASR模式决定（窗口形状为 AUDIO_SHAPES[mode]，共 AUDIO_WINDOW 帧）
+        row = int(np.prod(AUDIO_SHAPES[self.mode])) // AUDIO_WINDOW
+        windows = audio_windows(np.load(self.config.calibration_audio_path).reshape(-1, row))
+        count = min(self.config.calibration_frames, self.len_img)
+        img_indices = np.linspace(0, self.len_img - 1, count).astype(int)
+        frame_numbers = np.linspace(0, len(windows) - 1, count).astype(int)
+        batch_size = self.config.inference_batch_size
+        for start in range(0, count, batch_size):
+            patches = np.stack([self._face_patch(img_idx)[0] for img_idx in img_indices[start:start + batch_size]])
+            audio = windows[frame_numbers[start:start + batch_size]]
+            yield patches, audio.reshape((len(patches),) + AUDIO_SHAPES[self.mode])
+
+    def _report_precision_drift(self, config: Config):
+        """在校准数据上比较当前精度与fp32的人脸输出，打印并返回PSNR/SSIM"""
+        if not config.calibration_audio_path:
+            print("未配置 calibration_audio_path，跳过精度漂移报告")
+            return None
+        reference = create_backend(replace(config, precision="fp32", torch_compile="none"))
+        pairs = []
+        for patches, audio in self._calibration_batches():
+            expected = reference.decode(reference.encode(patches), audio).copy()
+            actual = self.backend.decode(self.backend.encode(patches), audio).copy()
+            pairs.extend(zip(expected, actual))
+        report = drift_report(pairs)
+        if not report:
+            print("校准数据为空，跳过精度漂移报告")
+            return None
+        print(f"{config.precision} 相对 fp32 的漂移（{report['frames']} 帧）: "
+              f"PSNR 均值 {report['psnr_mean']:.2f}dB / 最差 {report['psnr_min']:.2f}dB, "
+              f"SSIM 均值 {report['ssim_mean']:.4f} / 最差 {report['ssim_min']:.4f}")
+        return report
+
+    def _encoder_cache_path(self):
+        """编码器特征缓存文件路径，以后端缓存键（权重内容、模式、后端）和形象帧数为键"""
+        key = f"{self.backend.cache_key}:{self.len_img}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        if self.bundle is not None:
+            return f"{self.bundle.path}.encoder_{digest}.npz"
+        return os.path.join(self.dataset_dir, f"encoder_cache_{digest}.npz")
+
+    def _init_encoder_cache(self, config: Config):
+        """按形象帧缓存UNet编码器输出，可选持久化到形象旁
+
+        每帧特征的大小由网络宽度决定（base 约 6MB，slim 约 3MB）。持久化文件逐帧流式读写；
+        启动时只预加载缓存预算放得下的帧。
+        """
+        self.encoder_cache = LRUByteCache(config.encoder_cache_max_bytes, sizeof=lambda entry: entry.nbytes)
+        if not config.encoder_cache_persist:
+            return
+
+        path = self._encoder_cache_path()
+        if os.path.exists(path):
+            try:
+                loaded = 0
+                with np.load(path) as saved:
+                    for img_idx in range(self.len_img):
+                        skips = self.backend.skips_from_numpy([saved[f"{img_idx}_{k}"] for k in range(5)])
+                        crop_img, crop_size = self._face_patch(img_idx)
+                        if not self._preload_encoding(img_idx, FaceEncoding(
+                                skips, crop_img, crop_size, self.backend.skips_nbytes(skips))):
+                            break
+                        loaded += 1
+                print(f"已加载编码器特征缓存: {path}（{loaded}/{self.len_img} 帧）")
+                return
+            except Exception as e:
+                print(f"编码器特征缓存读取失败，重新计算: {e}")
+
+        # 按推理批大小分批编码，逐帧写入npz（与 np.savez 格式相同），内存中只保留一批特征
+        batch_size = config.inference_batch_size
+        room = True
+        try:
+            tmp_path = path + ".tmp"
+            with zipfile.ZipFile(tmp_path, "w", allowZip64=True) as archive:
+                for start in range(0, self.len_img, batch_size):
+                    img_indices = list(range(start, min(start + batch_size, self.len_img)))
+                    patches = [self._face_patch(img_idx) for img_idx in img_indices]
+                    frame_skips = self.backend.encode(np.stack([patch for patch, _ in patches]))
+                    for img_idx, (crop_img, crop_size), skips in zip(img_indices, patches, frame_skips):
+                        for k, arr in enumerate(self.backend.skips_to_numpy(skips)):
+                            with archive.open(f"{img_idx}_{k}.npy", "w", force_zip64=True) as f:
+                                np.lib.format.write_array(f, arr)
+                        room = room and self._preload_encoding(img_idx, FaceEncoding(
+                            skips, crop_img, crop_size, self.backend.skips_nbytes(skips)))
+            os.replace(tmp_path, path)
+            print(f"已保存编码器特征缓存: {path}")
+        except OSError as e:
+            print(f"编码器特征缓存写入失败: {e}")
+
+    def _preload_encoding(self, img_idx, entry):
+        """预加载一帧编码器特征；缓存预算已满时不写入并返回 False（避免淘汰已预加载的帧）"""
+        cache = self.encoder_cache
+        if cache.nbytes + entry.nbytes > cache.max_bytes:
+            print(f"编码器特征缓存只能容纳 {len(cache)}/{self.len_img} 帧（每帧 {entry.nbytes / 2 ** 20:.1f}MB），"
+                  f"顺序播放时命中率很低，可增大 encoder_cache_max_bytes")
+            return False
+        return cache.put(img_idx, entry)
+
+    def _face_patch(self, img_idx):
+        """获取168x168人脸图及其在底图中的裁剪尺寸 (h, w)"""
+        xmin, ymin, xmax, ymax = self.landmarks.box(img_idx)
+        if self.bundle is not None:
+            # 裁剪尺寸按底图边界截断计算（与切片语义相同），不必解码整帧
+            crop_size = (len(range(self.h)[ymin:ymax]), len(range(self.w)[xmin:xmax]))
+            crop_img = np.array(self.bundle.face_patches[img_idx])
+        else:
+            crop_img, crop_size = crop_face(self.frame_cache.get(img_idx), (xmin, ymin, xmax, ymax))
+        crop_img.setflags(write=False)
+        return crop_img, crop_size
+
+    def _get_face_encoding(self, img_idx):
+        """获取形象帧的编码器特征，未命中时计算并写入缓存"""
+        return self._get_face_encodings([img_idx])[0]
+
+    def _get_face_encodings(self, indices, backend=None):
+        """批量获取编码器特征，所有未命中的帧合并为一次编码器前向"""
+        backend = backend or self._thread_backend()
+        entries = [self.encoder_cache.get(img_idx) for img_idx in indices]
+        missing = sorted({img_idx for img_idx, entry in zip(indices, entries) if entry is None})
+        if missing:
+            patches = [self._face_patch(img_idx) for img_idx in missing]
+            frame_skips = backend.encode(np.stack([patch for patch, _ in patches]))
+            computed = {}
+            for img_idx, (crop_img, crop_size), skips in zip(missing, patches, frame_skips):
+                computed[img_idx] = FaceEncoding(skips, crop_img, crop_size, backend.skips_nbytes(skips))
+                self.encoder_cache.put(img_idx, computed[img_idx])
+            entries = [entry if entry is not None else computed[img_idx] for img_idx, entry in zip(indices, entries)]
+        return entries
+
+    def warmup(self):
+        """引擎启动时预热推理后端（满批与单帧两种批大小）"""
+        start = time.time()
+        self.backend.warmup(sorted({1, self.config.inference_batch_size}))
+        print(f"推理后端预热完成，用时 {time.time() - start:.2f}s")
+
+    def process_frame(self, img_idx, current_frame, context=None):
         """处理视频帧"""
-        img_path = os.path.join(self.img_dir, f"{img_idx}.jpg")
-        lms_path = os.path.join(self.lms_dir, f"{img_idx}.lms")
-
-        img = self.load_image(img_path)
-        lms_list = []
-        with open(lms_path, "r") as f:
-            lines = f.read().splitlines()
-            for line in lines:
-                arr = line.split(" ")
-                arr = np.array(arr, dtype=np.float32)
-                lms_list.append(arr)
-        lms = np.array(lms_list, dtype=np.int32)
-        xmin = lms[1][0]
-        ymin = lms[52][1]
-
-        xmax = lms[31][0]
-        width = xmax - xmin
-        ymax = ymin + width
-        crop_img = img[ymin:ymax, xmin:xmax]
-        h, w = crop_img.shape[:2]
-        crop_img = cv2.resize(crop_img, (168, 168), cv2.INTER_AREA)
-        crop_img_ori = crop_img.copy()
-        img_real_ex = crop_img[4:164, 4:164].copy()
-        img_real_ex_ori = img_real_ex.copy()
-        img_masked = cv2.rectangle(img_real_ex_ori, (5, 5, 150, 145), (0, 0, 0), -1)
-
-        img_masked = img_masked.transpose(2, 0, 1).astype(np.float32)
-        img_real_ex = img_real_ex.transpose(2, 0, 1).astype(np.float32)
-
-        img_real_ex_T = torch.from_numpy(img_real_ex / 255.0)
-        img_masked_T = torch.from_numpy(img_masked / 255.0)
-        img_concat_T = torch.cat([img_real_ex_T, img_masked_T], axis=0)[None]
-        audio_feat = self.get_audio_features(current_frame)
-        if self.mode == "hubert":
-            audio_feat = audio_feat.reshape(32, 32, 32)
-        if self.mode == "wenet":
-            audio_feat = audio_feat.reshape(256, 16, 32)
-        audio_feat = audio_feat[None]
-        audio_feat = audio_feat.cuda()
-        img_concat_T = img_concat_T.cuda()
-
-        with torch.no_grad():
-            pred = self.net(img_concat_T, audio_feat)[0]
-
-        pred = pred.cpu().numpy().transpose(1, 2, 0) * 255
-        pred = np.array(pred, dtype=np.uint8)
-        crop_img_ori[4:164, 4:164] = pred
-        crop_img_ori = cv2.resize(crop_img_ori, (w, h))
-        img[ymin:ymax, xmin:xmax] = crop_img_ori
+        return next(self.process_frames([img_idx], [current_frame], batch_size=1, pooled=False, context=context))
+
+    def process_frames(self, indices, frame_numbers, batch_size=None, roi=None, pooled=None, active=None,
+                       stride=None, interpolation=None, hold=None, backend=None, context=None):
+        """批量处理视频帧
+
+        将形象帧的编码器特征与音频窗口堆叠成一个批次，一次前向推理，
+        按输入顺序逐帧产出合成后的完整图像，ROI模式下产出 FramePatch。
+
+        :param indices: 每帧使用的形象帧索引
+        :param frame_numbers: 每帧对应的音频特征帧号
+        :param batch_size: 批大小，默认使用配置中的 inference_batch_size
+        :param roi: 是否只输出人脸区域，默认由配置中的 output_mode 决定
+        :param pooled: 整帧是否写入帧缓冲池并产出 PooledFrame（使用方负责 release()），
+                       默认在配置了 frame_pool_size 时启用
+        :param active: 每帧是否有声；为 False 的帧不做推理，输出缓存的静音画面
+        :param stride: 每隔几帧推理一次，中间帧由相邻推理帧插值，默认使用配置中的 inference_stride
+        :param interpolation: 中间帧插值方式 blend / flow，默认使用配置中的 frame_interpolation
+        :param hold: 每帧是否重复上一帧（赶不上呈现截止时间的帧），为 True 的帧不做推理
+        :param backend: 使用的推理后端，默认为当前线程的后端副本
+        :param context: 渲染上下文（create_context 创建），默认使用 set_audio_features 设置的上下文
+        """
+        indices = list(indices)
+        frame_numbers = list(frame_numbers)
+        batch_size = batch_size or self.config.inference_batch_size
+        if roi is None:
+            roi = self.config.output_mode == "roi"
+        if pooled is None:
+            pooled = self.frame_pool is not None
+        stride = stride or self.config.inference_stride
+        interpolation = interpolation or self.config.frame_interpolation
+        backend = backend or self._thread_backend()
+        context = context or self.context
+        for start in range(0, len(indices), batch_size):
+            batch_indices = indices[start:start + batch_size]
+            batch_numbers = frame_numbers[start:start + batch_size]
+            speaking = [True] * len(batch_indices) if active is None else list(active[start:start + batch_size])
+            held = [False] * len(batch_indices) if hold is None else list(hold[start:start + batch_size])
+            frame_patches = self._batch_patches(batch_indices, batch_numbers, speaking, held, stride, interpolation,
+                                                backend, context)
+            yield from self._emit_frames(batch_indices, frame_patches, roi, pooled, backend, context)
+
+    def _batch_patches(self, indices, frame_numbers, speaking, held, stride, interpolation, backend, context):
+        """渲染一批帧的人脸区域；重复上一帧的位置为 None，由 _emit_frames 按输出顺序填充"""
+        voiced = [k for k, s in enumerate(speaking) if s and not held[k]]
+        silent = [k for k, s in enumerate(speaking) if not s and not held[k]]
+        frame_patches = [None] * len(indices)
+        if voiced:
+            voiced_indices = [indices[k] for k in voiced]
+            voiced_numbers = [frame_numbers[k] for k in voiced]
+            if stride > 1:
+                rendered = self._strided_patches(voiced_indices, voiced_numbers, stride, interpolation,
+                                                 backend, context)
+            else:
+                rendered = self._render_patches(voiced_indices, context.audio_batch(voiced_numbers), backend)
+            for k, frame_patch in zip(voiced, rendered):
+                frame_patches[k] = frame_patch
+        if silent:
+            for k, frame_patch in zip(silent, self._silent_patches([indices[k] for k in silent], backend)):
+                frame_patches[k] = frame_patch
+        return frame_patches
+
+    def _emit_frames(self, indices, frame_patches, roi, pooled, backend, context):
+        """按输出顺序产出一批帧：重复上一帧的位置取上下文中最近输出的人脸区域，再按输出方式合成"""
+        for img_idx, frame_patch in zip(indices, frame_patches):
+            if frame_patch is None:
+                frame_patch = context.last_patch or self._silent_patches([img_idx], backend)[0]
+            context.last_patch = frame_patch
+            if roi:
+                yield frame_patch
+            elif pooled:
+                frame = self.frame_pool.acquire(timeout=FRAME_POOL_TIMEOUT)
+                self.compositor.compose(frame_patch.base_index, frame_patch.rect, frame_patch.patch,
+                                        out=frame.array)
+                yield frame
+            else:
+                yield self.compositor.compose(frame_patch.base_index, frame_patch.rect, frame_patch.patch)
 
-        return img
+    def _render_patches(self, indices, audio_feat, backend):
+        """一次前向推理生成一批人脸区域"""
+        entries = self._get_face_encodings(indices, backend)
+        preds = backend.decode([entry.skips for entry in entries], audio_feat)
+        return [self._render_patch(img_idx, entry, pred) for img_idx, entry, pred in zip(indices, entries, preds)]
+
+    def _strided_patches(self, indices, frame_numbers, stride, interpolation, backend, context):
+        """隔帧推理：只对帧号为 stride 整数倍的关键帧推理，中间帧由前后关键帧的预测插值
+
+        不在本批中的相邻关键帧按帧号推算形象帧索引后一并推理；
+        最后一个关键帧的预测保留到下一批，连续处理时每个关键帧只推理一次。
+        """
+        key_indices = {n: img_idx for img_idx, n in zip(indices, frame_numbers) if n % stride == 0}
+        neighbours = []
+        for img_idx, n in zip(indices, frame_numbers):
+            if n % stride == 0:
+                neighbours.append(None)
+                continue
+            prev = n - n % stride
+            # 句尾之后没有下一个关键帧时，该帧自己推理
+            nxt = prev + stride if prev + stride < len(context.audio_windows) else n
+            for k in (prev, nxt):
+                key_indices.setdefault(k, (img_idx + k - n) % self.len_img)
+            neighbours.append((prev, nxt))
+
+        keys = sorted(key_indices)
+        carried = context.stride_cache
+        preds = {k: carried[(k, key_indices[k])] for k in keys if (k, key_indices[k]) in carried}
+        missing = [k for k in keys if k not in preds]
+        if missing:
+            entries = self._get_face_encodings([key_indices[k] for k in missing], backend)
+            decoded = backend.decode([entry.skips for entry in entries], context.audio_batch(missing))
+            preds.update(zip(missing, decoded))
+        # 后端可能复用输出缓冲区，保留的预测需要拷贝
+        context.stride_cache = {(keys[-1], key_indices[keys[-1]]): np.array(preds[keys[-1]])}
+
+        entries = self._get_face_encodings(indices, backend)
+        rendered = []
+        for img_idx, n, entry, pair in zip(indices, frame_numbers, entries, neighbours):
+            if pair is None or pair[1] == n:
+                pred = preds[n]
+            else:
+                prev, nxt = pair
+                pred = interpolate_faces(preds[prev], preds[nxt], (n - prev) / (nxt - prev), interpolation)
+            rendered.append(self._render_patch(img_idx, entry, pred))
+        return rendered
+
+    def _silent_patches(self, indices, backend):
+        """静音帧的人脸区域：缓存的闭口渲染（全零音频窗口），或直接取底图"""
+        if self.config.silence_frame == "raw":
+            return [FramePatch(img_idx, rect, patch)
+                    for img_idx in indices
+                    for rect, patch in [self.compositor.base_patch(img_idx, self._face_rect(img_idx))]]
+
+        cached = {img_idx: self.silent_cache.get(img_idx) for img_idx in set(indices)}
+        missing = [img_idx for img_idx, frame_patch in cached.items() if frame_patch is None]
+        if missing:
+            audio_feat = np.zeros((len(missing),) + AUDIO_SHAPES[self.mode], dtype=np.float32)
+            for img_idx, frame_patch in zip(missing, self._render_patches(missing, audio_feat, backend)):
+                frame_patch.patch.setflags(write=False)
+                self.silent_cache.put(img_idx, frame_patch)
+                cached[img_idx] = frame_patch
+        return [cached[img_idx] for img_idx in indices]
+
+    def _face_rect(self, img_idx):
+        """输出坐标下的人脸区域（裁剪框按底图边界截断）"""
+        xmin, ymin, xmax, ymax = self.landmarks.box(img_idx)
+        return self.compositor.scale_rect((xmin, ymin, min(xmax, self.w), min(ymax, self.h)))
+
+    def _render_patch(self, img_idx, entry, pred):
+        """将160x160预测结果贴回人脸图，缩放到输出坐标下的人脸区域并转换为输出格式"""
+        xmin, ymin, xmax, ymax = self.landmarks.box(img_idx)
+        h, w = entry.crop_size
+        crop_img_ori = entry.patch.copy()
+        crop_img_ori[4:164, 4:164] = pred
+        # 裁剪框超出底图的部分按底图边界截断（crop_size 即截断后的尺寸）
+        rect = self.compositor.scale_rect((xmin, ymin, xmin + w, ymin + h))
+        crop_img_ori = cv2.resize(crop_img_ori, (rect[2] - rect[0], rect[3] - rect[1]))
+        rect, patch = self.compositor.make_patch(img_idx, rect, crop_img_ori)
+        return FramePatch(img_idx, rect, patch)